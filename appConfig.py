@@ -0,0 +1,56 @@
+"""
+GUI（mainApp）、批量生成（batchCli）和后台自动同步（autoSync）共用的配置与本地存储。
+"""
+import json
+import os
+
+from detailCache import DetailCache
+from orderStore import OrderStore
+
+CONFIG_FILENAME = "config.json"
+COOKIE_FILENAME = "session_cookies.json"
+DEFAULT_OUTPUT_DIR = "//VIVA303-WORK/Viva店面共享"
+OUTPUT_PREFIX = "Viva自提单生成H"
+
+
+def load_config():
+    """加载配置文件"""
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_path, CONFIG_FILENAME)
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    else:
+        raise FileNotFoundError(f"配置文件未找到: {config_path}")
+
+
+def open_detail_cache(config, base_path):
+    """根据配置打开订单详情缓存，未配置或打开失败时返回 None"""
+    cache_file = config.get("detail_cache_file", "")
+    if not cache_file:
+        return None
+    try:
+        return DetailCache(
+            os.path.join(base_path, cache_file),
+            ttl_seconds=config.get("detail_cache_ttl_hours", 24) * 3600,
+            max_bytes=config.get("detail_cache_max_mb", 50) * 1024 * 1024,
+            check_finished=bool(config.get("detail_cache_check_finished", 1))
+        )
+    except Exception as e:
+        print(f"无法打开详情缓存: {e}")
+        return None
+
+
+def open_order_store(config, base_path):
+    """根据配置打开本地订单库，未配置或打开失败时返回 None"""
+    store_file = config.get("order_store_file", "")
+    if not store_file:
+        return None
+    try:
+        return OrderStore(
+            os.path.join(base_path, store_file),
+            detail_ttl_seconds=config.get("order_store_detail_ttl_hours", 24) * 3600
+        )
+    except Exception as e:
+        print(f"无法打开本地订单库: {e}")
+        return None
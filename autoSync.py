@@ -0,0 +1,218 @@
+"""
+后台自动同步服务：定时轮询列表页，预先生成并发布当天的自提单。
+
+复用 GUI 保存的登录 cookie（不会打开浏览器），每隔 auto_sync_interval_seconds 秒：
+增量同步列表页 → 筛选当天订单 → 订单或 finished 有变化时重新生成工作簿并发布。
+详情页只在缓存（本地订单库或详情缓存）中没有、或订单 finished 变化时才请求。
+运行状态写入 auto_sync_status_file，GUI 据此判断能否直接使用预生成的文件。
+
+用法:
+    python autoSync.py            # 持续运行，Ctrl+C 退出
+    python autoSync.py --once     # 只同步一次（适合用计划任务定时调用）
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from appConfig import (COOKIE_FILENAME, DEFAULT_OUTPUT_DIR, OUTPUT_PREFIX, load_config, open_detail_cache,
+                       open_order_store)
+from dataProcessor import DataProcessor, http_options_from_config
+from excelWriter import ExcelWriter
+from publisher import Publisher
+from shortageReport import ShortageReport
+
+STATUS_FILENAME = "auto_sync_status.json"
+
+
+def status_path_from_config(config):
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, config.get("auto_sync_status_file", STATUS_FILENAME))
+
+
+def read_status(status_path):
+    """读取后台服务的状态文件，不存在或无法解析时返回 None"""
+    try:
+        with open(status_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def status_age_seconds(status):
+    """状态中最近一次成功同步距今的秒数，从未成功同步时返回 None"""
+    if not status or not status.get("synced_at"):
+        return None
+    return (datetime.now() - datetime.fromisoformat(status["synced_at"])).total_seconds()
+
+
+class AutoSyncService:
+    """定时同步并预生成当天自提单的服务"""
+
+    def __init__(self, config):
+        self.config = config
+        self.base_path = os.path.dirname(os.path.abspath(__file__))
+        self.cookie_path = os.path.join(self.base_path, config.get("cookie_file", COOKIE_FILENAME))
+        self.status_path = status_path_from_config(config)
+        self.interval = config.get("auto_sync_interval_seconds", 300)
+        # 生成条件与 GUI 的选项对应，GUI 只在选项一致时直接使用预生成的文件
+        self.options = {
+            "include_stock_status": bool(config.get("auto_sync_include_stock_status", 0)),
+            "finished_filter": config.get("auto_sync_finished_filter", -1),
+            "skip_negative_qty": bool(config.get("auto_sync_skip_negative_qty", 1)),
+        }
+        self.processor = DataProcessor(
+            snapshot_max_age=0,
+            http_options=http_options_from_config(config),
+            parse_processes=config.get("parse_processes", 0),
+            parse_process_min_bytes=config.get("parse_process_min_kb", 64) * 1024
+        )
+        self.writer = ExcelWriter()
+        self.publisher = Publisher(config.get("output_dir", DEFAULT_OUTPUT_DIR), config.get("staging_dir") or None)
+        self.order_store = open_order_store(config, self.base_path)
+        self.cache = self.order_store or open_detail_cache(config, self.base_path)
+        self.session = None
+        self.fingerprint = None  # 上次生成时的 (目标日期, [(OriginalID, finished)])
+        self.status = read_status(self.status_path) or {}
+
+    def write_status(self, **fields):
+        """更新并原子写入状态文件"""
+        self.status.update(fields, pid=os.getpid(), interval_seconds=self.interval, options=self.options,
+                           updated_at=datetime.now().isoformat(timespec="seconds"))
+        temp_path = f"{self.status_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.status, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.status_path)
+
+    def ensure_session(self):
+        """复用保存的 cookie；失效时返回 False，等待用户在 GUI 中重新登录"""
+        if self.session is not None:
+            return True
+        session = self.processor.load_saved_session(self.cookie_path)
+        if session is None:
+            return False
+        if self.processor.fetch_default_order_number(session, self.config.get("url1", "")) in ("解析错误", "URL错误"):
+            return False
+        self.session = session
+        return True
+
+    def filter_today(self, target):
+        """增量同步后筛选当天的订单"""
+        url1 = self.config.get("url1", "")
+        finished_filter = self.options["finished_filter"]
+        if self.order_store is not None:
+            self.processor.sync_order_store(
+                self.session, url1, self.order_store,
+                resync_days=self.config.get("order_store_resync_days", 7),
+                min_date=target,
+                prefetch_pages=self.config.get("prefetch_pages", 2),
+                max_pages=self.config.get("max_pages", 50)
+            )
+            filtered_data = self.processor.query_order_store(self.order_store, target, "date", finished_filter)
+            if filtered_data is not None:
+                return filtered_data
+        datalist = self.processor.iter_datalist(
+            self.session, url1, min_date=target,
+            prefetch_pages=self.config.get("prefetch_pages", 2),
+            max_pages=self.config.get("max_pages", 50)
+        )
+        filtered_data = self.processor.filter_data(datalist, target, "date", finished_filter)
+        datalist.close()
+        return filtered_data
+
+    def sync_once(self):
+        """同步一次；当天订单有变化时重新生成并发布工作簿"""
+        target = date.today()
+        filename = f"{OUTPUT_PREFIX}_{target}.xlsx"
+        self.write_status(state="syncing", message="正在同步")
+        if not self.ensure_session():
+            self.write_status(state="login_required", message="保存的登录已失效，请在主程序中重新登录")
+            return
+
+        for dest_path in self.publisher.retry_pending():
+            print(f"已补发: {dest_path}")
+
+        filtered_data = self.filter_today(target)
+        fingerprint = (str(target), [(data["OriginalID"], data.get("finished")) for data in filtered_data])
+        if fingerprint == self.fingerprint:
+            self.write_status(state="ok", synced_at=datetime.now().isoformat(timespec="seconds"),
+                              message="没有新订单或变化")
+            return
+        if not filtered_data:
+            self.fingerprint = fingerprint
+            self.write_status(state="ok", synced_at=datetime.now().isoformat(timespec="seconds"),
+                              target=str(target), filename=None, output_path=None, published=False,
+                              order_count=0, failed_orders=[], message="当天没有订单")
+            return
+
+        failures = []
+        data_rows = self.processor.iter_order_rows(
+            filtered_data, self.session, self.config.get("base_url", ""),
+            self.options["include_stock_status"], self.options["skip_negative_qty"],
+            max_workers=self.config.get("fetch_workers", 1),
+            cache=self.cache,
+            failures=failures
+        )
+        local_path = self.publisher.staging_path(filename)
+        self.writer.write(data_rows, local_path,
+                          shortage_report=ShortageReport() if self.options["include_stock_status"] else None)
+        published, dest_path = self.publisher.publish(local_path, filename)
+
+        # 有获取失败的订单时不记录指纹，下一轮重新生成
+        self.fingerprint = fingerprint if not failures else None
+        self.write_status(
+            state="ok",
+            synced_at=datetime.now().isoformat(timespec="seconds"),
+            target=str(target),
+            filename=filename,
+            output_path=dest_path,
+            local_path=None if published else local_path,
+            published=published,
+            order_count=len(filtered_data),
+            failed_orders=[failure["Number"] for failure in failures],
+            message="已生成" if published else "已生成，共享目录不可用，已加入重试队列"
+        )
+        print(f"{datetime.now():%H:%M:%S} 已生成 {filename}（{len(filtered_data)} 个订单）")
+
+    def run_forever(self):
+        while True:
+            try:
+                self.sync_once()
+            except Exception as e:
+                print(f"同步失败: {e}")
+                self.session = None  # 下一轮重新验证登录
+                self.write_status(state="error", message=str(e))
+            self.write_status(next_sync_at=datetime.fromtimestamp(time.time() + self.interval)
+                              .isoformat(timespec="seconds"))
+            time.sleep(self.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VIVA 自提单后台自动同步")
+    parser.add_argument("--once", action="store_true", help="只同步一次后退出")
+    args = parser.parse_args(argv)
+
+    service = AutoSyncService(load_config())
+    try:
+        if args.once:
+            try:
+                service.sync_once()
+            except Exception as e:
+                service.write_status(state="error", message=str(e))
+                raise
+            return 0
+        try:
+            service.run_forever()
+        except KeyboardInterrupt:
+            service.write_status(state="stopped", message="后台服务已停止")
+        return 0
+    finally:
+        service.processor.shutdown()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+无界面批量生成自提单。
+
+示例:
+    python batchCli.py --from 2025-01-06 --to 2025-01-12
+    python batchCli.py --numbers S001234 S001240 --single-workbook
+    python batchCli.py --salesperson alice bob --from 2025-01-01 --to 2025-01-31 --finished unfinished
+    python batchCli.py --from 2025-01-06 --record fixtures/2025-01-06.jsonl.gz
+    python batchCli.py --from 2025-01-06 --replay fixtures/2025-01-06.jsonl.gz --replay-latency-ms 80
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from datetime import datetime, timedelta
+
+from appConfig import (COOKIE_FILENAME, DEFAULT_OUTPUT_DIR, OUTPUT_PREFIX, load_config, open_detail_cache,
+                       open_order_store)
+from dataProcessor import DataProcessor, http_options_from_config, target_label
+from datalistIndex import DatalistIndex
+from excelWriter import ExcelWriter
+from publisher import Publisher
+from runProfiler import RunProfiler
+from shortageReport import ShortageReport
+
+REPLAY_OUTPUT_DIR = "replay_output"
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="VIVA 自提单批量生成（无界面）")
+    targets = parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument("--from", dest="date_from", type=parse_date, help="起始日期 YYYY-MM-DD")
+    targets.add_argument("--numbers", nargs="+", help="一个或多个单号")
+    parser.add_argument("--salesperson", nargs="+",
+                        help="按销售生成 --from/--to 之间的订单，从本地订单库查询（需配置 order_store_file）")
+    parser.add_argument("--to", dest="date_to", type=parse_date, help="结束日期 YYYY-MM-DD（含），默认与起始日期相同")
+    parser.add_argument("--finished", choices=["all", "finished", "unfinished"], default="all",
+                        help="只生成已完结 / 未完结的订单，默认全部")
+    parser.add_argument("--stock-status", action="store_true", help="生成订货列和缺货汇总工作表")
+    parser.add_argument("--keep-negative", action="store_true", help="保留负数量记录")
+    parser.add_argument("--single-workbook", action="store_true", help="所有目标写入同一个工作簿，每个目标一个工作表")
+    parser.add_argument("--output-dir", help="输出目录，默认使用配置中的 output_dir")
+    parser.add_argument("--name", help="--single-workbook 时的输出文件名（不含扩展名）")
+    parser.add_argument("--profile", action="store_true", help="采集 cProfile，并在运行报告中输出热点函数")
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument("--record", metavar="PATH", help="将列表页和详情页响应（去除 cookie 和个人信息）录制到文件")
+    fixtures.add_argument("--replay", metavar="PATH", help="不登录、不联网，从录制文件回放响应")
+    parser.add_argument("--replay-latency-ms", type=float, default=0, help="回放时每个请求注入的延迟")
+    parser.add_argument("--replay-jitter-ms", type=float, default=0, help="回放时在延迟上叠加 0 到该值的随机抖动")
+    args = parser.parse_args(argv)
+    if args.date_to and not args.date_from:
+        parser.error("--to 需要与 --from 一起使用")
+    if args.salesperson and not args.date_from:
+        parser.error("--salesperson 需要与 --from 一起使用")
+    if args.date_from and args.date_to and args.date_to < args.date_from:
+        parser.error("--to 不能早于 --from")
+    if args.salesperson and (args.record or args.replay):
+        parser.error("--salesperson 依赖本地订单库，不能与 --record / --replay 一起使用")
+    return args
+
+
+def build_targets(args):
+    """返回 (模式, 目标列表)"""
+    if args.numbers:
+        return "orderNumber", list(dict.fromkeys(args.numbers))
+    date_to = args.date_to or args.date_from
+    if args.salesperson:
+        return "salesperson", [(name, args.date_from, date_to) for name in dict.fromkeys(args.salesperson)]
+    days = (date_to - args.date_from).days
+    return "date", [args.date_from + timedelta(days=offset) for offset in range(days + 1)]
+
+
+def get_session(processor, config, cookie_path):
+    """优先复用已保存的 cookie，失效时启动浏览器并在终端等待用户登录"""
+    url1 = config.get("url1", "")
+    session = processor.load_saved_session(cookie_path)
+    if session is not None:
+        default_order_number = processor.fetch_default_order_number(session, url1)
+        if default_order_number not in ("解析错误", "URL错误") and default_order_number:
+            return session
+
+    session = processor.get_authenticated_session(
+        config.get("login_url", ""),
+        wait_for_login=lambda: input("请在浏览器中完成登录后按回车继续...")
+    )
+    if processor.fetch_default_order_number(session, url1) in ("解析错误", "URL错误"):
+        raise ValueError("登录失败，无法解析列表页。")
+    try:
+        processor.save_session_cookies(session, cookie_path)
+    except OSError as e:
+        print(f"无法保存 cookie: {e}")
+    return session
+
+
+def print_progress(stage, done, total):
+    if stage == "pages":
+        print(f"\r已获取列表页: {done}", end="", file=sys.stderr)
+    elif stage == "orders":
+        print(f"\r已获取订单: {done}/{total}", end="", file=sys.stderr)
+    elif stage == "rows" and done % 500 == 0:
+        print(f"\r已写入行: {done}", end="", file=sys.stderr)
+    if stage == "orders" and done == total:
+        print(file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config()
+    profiler = RunProfiler(enable_cprofile=args.profile)
+    profiler.start_cprofile()
+    try:
+        return run_batch(args, config, profiler)
+    finally:
+        profiler.stop()
+        print(profiler.report(), file=sys.stderr)
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        try:
+            report_path = profiler.save(os.path.join(base_path, config.get("report_dir", "run_reports")))
+            print(f"运行报告已保存: {report_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"无法保存运行报告: {e}", file=sys.stderr)
+
+
+def run_batch(args, config, profiler):
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    cookie_path = os.path.join(base_path, config.get("cookie_file", COOKIE_FILENAME))
+    finished_filter = {"all": -1, "finished": 1, "unfinished": 0}[args.finished]
+    # 录制和回放时不使用列表页快照和详情缓存，保证每个页面都经过网络（或录制文件）
+    fixture_mode = bool(args.record or args.replay)
+    if args.replay and not args.output_dir:
+        # 回放的数据已去除个人信息，不发布到共享目录
+        args.output_dir = os.path.join(base_path, REPLAY_OUTPUT_DIR)
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    processor = DataProcessor(
+        snapshot_max_age=0 if fixture_mode else config.get("datalist_snapshot_seconds", 300),
+        http_options=http_options_from_config(config),
+        parse_processes=config.get("parse_processes", 0),
+        parse_process_min_bytes=config.get("parse_process_min_kb", 64) * 1024
+    )
+    writer = ExcelWriter()
+    processor.profiler = profiler
+    mode, targets = build_targets(args)
+    archive = None
+    if fixture_mode:
+        from httpFixtures import start_recording, start_replay
+    if args.replay:
+        session = processor.new_session()
+        start_replay(session, args.replay, args.replay_latency_ms, args.replay_jitter_ms)
+    else:
+        with profiler.stage("登录"):
+            session = get_session(processor, config, cookie_path)
+        if args.record:
+            archive = start_recording(session, meta={"url1": config.get("url1", ""),
+                                                     "base_url": config.get("base_url", "")})
+    profiler.attach(session)
+    try:
+        return run_targets(args, config, processor, writer, session, profiler, mode, targets, finished_filter,
+                           fixture_mode)
+    finally:
+        if archive is not None:
+            archive.save(args.record)
+            print(f"已录制 {len(archive.entries)} 个响应: {args.record}", file=sys.stderr)
+        processor.shutdown()
+
+
+def run_targets(args, config, processor, writer, session, profiler, mode, targets, finished_filter, fixture_mode):
+    base_path = os.path.dirname(os.path.abspath(__file__))
+
+    if mode == "salesperson":
+        order_store = open_order_store(config, base_path)
+        if order_store is None:
+            raise ValueError("按销售生成需要在配置中设置 order_store_file")
+        with profiler.stage("同步订单库"):
+            synced = processor.sync_order_store(
+                session, config.get("url1", ""), order_store,
+                resync_days=config.get("order_store_resync_days", 7),
+                min_date=args.date_from,
+                prefetch_pages=config.get("prefetch_pages", 2),
+                max_pages=config.get("max_pages", 50),
+                progress=print_progress
+            )
+        print(file=sys.stderr)
+        print(f"订单库已同步 {synced} 条订单")
+        with profiler.stage("订单库查询"):
+            filtered_by_target = {
+                target: processor.query_order_store(order_store, target, mode, finished_filter)
+                for target in targets
+            }
+        if any(filtered_data is None for filtered_data in filtered_by_target.values()):
+            raise ValueError(f"列表页最多翻 {config.get('max_pages', 50)} 页，未能同步到 {args.date_from}，"
+                             f"请缩小日期范围或增大 max_pages")
+        return write_outputs(args, config, processor, writer, session, profiler, targets, filtered_by_target,
+                             cache=order_store)
+
+    # 列表页只获取一次：按日期时翻到最早的目标日期为止，按单号时遍历到 max_pages；
+    # 建立索引后每个目标的筛选都是一次查表
+    with profiler.stage("列表页与索引"):
+        datalist = DatalistIndex(processor.iter_datalist(
+            session, config.get("url1", ""),
+            min_date=min(targets) if mode == "date" else None,
+            prefetch_pages=config.get("prefetch_pages", 2),
+            max_pages=config.get("max_pages", 50),
+            progress=print_progress,
+            use_snapshot=not fixture_mode
+        ))
+    print(file=sys.stderr)
+
+    with profiler.stage("筛选"):
+        filtered_by_target = {
+            target: processor.filter_data(datalist, target, mode, finished_filter)
+            for target in targets
+        }
+
+    cache = None if fixture_mode else open_detail_cache(config, base_path)
+    return write_outputs(args, config, processor, writer, session, profiler, targets, filtered_by_target, cache)
+
+
+def write_outputs(args, config, processor, writer, session, profiler, targets, filtered_by_target, cache):
+    """获取筛选结果的订单详情，写入工作簿并发布"""
+    output_dir = args.output_dir or config.get("output_dir", DEFAULT_OUTPUT_DIR)
+    for target in targets:
+        if not filtered_by_target[target]:
+            print(f"{target_label(target)}: 没有符合条件的记录")
+    filtered_by_target = {target: data for target, data in filtered_by_target.items() if data}
+    if not filtered_by_target:
+        return 1
+
+    # 详情页按目标顺序流式获取，每个订单的行取到后立即写入对应的工作表
+    failures = []
+    rows_by_target = processor.fetch_and_format_targets(
+        filtered_by_target, session, config.get("base_url", ""),
+        args.stock_status, not args.keep_negative,
+        max_workers=config.get("fetch_workers", 1),
+        progress=print_progress,
+        cache=cache,
+        failures=failures
+    )
+    rows_by_target = {target_label(target): rows for target, rows in rows_by_target.items()}
+
+    # 先在本地生成，再发布到共享目录；共享目录不可用时加入重试队列
+    publisher = Publisher(output_dir, config.get("staging_dir") or None)
+
+    if args.single_workbook:
+        name = args.name or f"{OUTPUT_PREFIX}_{target_label(targets[0])}_{target_label(targets[-1])}"
+        outputs = [(f"{name}.xlsx", rows_by_target)]
+    else:
+        outputs = [(f"{OUTPUT_PREFIX}_{target}.xlsx", {"数据提取": data_rows})
+                   for target, data_rows in rows_by_target.items()]
+    any_published = False
+    for filename, rows_by_sheet in outputs:
+        local_path = publisher.staging_path(filename)
+        with profiler.stage("获取订单详情并写入 Excel"):
+            writer.write_sheets(rows_by_sheet, local_path, progress=print_progress,
+                                shortage_report=ShortageReport() if args.stock_status else None)
+        with profiler.stage("发布到共享目录"):
+            published, dest_path = publisher.publish(local_path, filename)
+        if published:
+            any_published = True
+            print(f"已发布: {dest_path}")
+        else:
+            print(f"共享目录不可用，已加入重试队列: {dest_path}")
+
+    # 至少一个文件发布成功说明共享目录可用，再补发队列中的旧文件
+    if any_published:
+        for dest_path in publisher.retry_pending():
+            print(f"已补发: {dest_path}")
+
+    for failure in failures:
+        print(f"获取失败，未写入表格: {failure['Number']} ({failure['UserName']}): {failure['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
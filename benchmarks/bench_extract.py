@@ -0,0 +1,89 @@
+"""
+对比旧的 re.DOTALL 非贪婪正则提取与 scriptExtractor 的提取速度。
+
+用法:
+    python benchmarks/bench_extract.py [已保存的列表页.html ...] [--items 20000] [--repeat 5]
+
+未指定 HTML 文件时生成一个与真实列表页结构相同的合成页面。
+加速比因机器而异：同一 4 MB、20000 条的合成页面上实测为 1.34x（79.2 ms → 59.3 ms）到 2.44x，
+评估时请在目标机器上运行本脚本，不要直接引用这里的数字。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scriptExtractor  # noqa: E402
+
+
+def legacy_extract_datalist(html_content):
+    """旧实现：每次编译正则并用 .*? 跨页面搜索，再对捕获组整体 json.loads"""
+    match = re.search(r"var\s+datalist\s*=\s*(\[.*?\]);", html_content, re.DOTALL)
+    if not match:
+        return None
+    return json.loads(match.group(1))
+
+
+def build_synthetic_page(item_count):
+    """生成带有大量前后 HTML 和 var datalist 的合成列表页"""
+    datalist = [
+        {
+            "OriginalID": 100000 + i,
+            "Number": f"S{i:06d}",
+            "UserName": "销售员",
+            "FirstName": "First",
+            "LastName": "Last",
+            "Created": "2025-01-01 10:00:00",
+            "finished": i % 2,
+            "Memo": "备注" * 10,
+        }
+        for i in range(item_count)
+    ]
+    filler = "<tr><td>filler</td><td>row</td></tr>\n" * 5000
+    return (
+        f"<html><body><table>{filler}</table><script>"
+        f"var datalist = {json.dumps(datalist, ensure_ascii=False)};\nvar page = 1;"
+        f"</script>{filler}</body></html>"
+    )
+
+
+def time_call(func, html_content, repeat):
+    """返回 repeat 次调用的平均耗时（秒）和最后一次的结果"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(html_content)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="datalist 提取性能对比")
+    parser.add_argument("html_files", nargs="*", help="已保存的列表页 HTML 文件")
+    parser.add_argument("--items", type=int, default=20000, help="合成页面的 datalist 条数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种实现重复次数")
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.html_files:
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        pages.append((f"合成页面 ({args.items} 条)", build_synthetic_page(args.items)))
+
+    for name, html_content in pages:
+        legacy_time, legacy_result = time_call(legacy_extract_datalist, html_content, args.repeat)
+        new_time, new_result = time_call(scriptExtractor.extract_datalist, html_content, args.repeat)
+        if legacy_result != new_result:
+            print(f"{name}: 警告，两种实现的结果不一致")
+        print(f"{name}: {len(html_content) / 1024 / 1024:.1f} MB")
+        print(f"  旧正则提取: {legacy_time * 1000:.1f} ms")
+        print(f"  scriptExtractor: {new_time * 1000:.1f} ms")
+        print(f"  加速: {legacy_time / new_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+离线端到端基准测试：在本地模拟服务器上依次测量
+extract_datalist、iter_datalist + filter_data、fetch_and_format_data、Excel 写入，
+以及边获取详情边写入的流式管线（iter_order_rows → ExcelWriter.write）。
+
+用法:
+    python benchmarks/bench_pipeline.py [--sizes 10 100 1000 10000] [--latency-ms 5] [--workers 8]
+                                        [--padding-bytes 20000] [--parse-processes 4] [--json results.json]
+
+每个阶段记录耗时、吞吐量（条/秒）和 tracemalloc 峰值内存。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataProcessor import DataProcessor  # noqa: E402
+from excelWriter import ExcelWriter  # noqa: E402
+from stub_server import StubServer, SyntheticStore  # noqa: E402
+
+TARGET_DATE = date(2025, 1, 15)
+
+
+def measure(func):
+    """运行 func，返回 (结果, 耗时秒, 峰值内存字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_size(order_count, args):
+    """对一个订单规模运行全部阶段，返回各阶段结果"""
+    store = SyntheticStore(order_count, TARGET_DATE)
+    processor = DataProcessor(http_options={
+        "timeout": 30, "retries": 1, "backoff": 0.1,
+        "rate_per_second": args.rate, "burst": args.workers,
+        "pool_size": args.workers + args.prefetch,
+    }, parse_processes=args.parse_processes, parse_process_min_bytes=args.parse_min_kb * 1024)
+    writer = ExcelWriter()
+    results = []
+
+    with StubServer(store, page_size=args.page_size, latency_ms=args.latency_ms,
+                    padding_bytes=args.padding_bytes) as server:
+        session = processor.new_session()
+        max_pages = order_count // args.page_size + 2
+
+        # 单独测量解析一页列表页（不含网络）
+        html_content = server.render_index(1)
+        datalist, elapsed, peak = measure(lambda: processor.extract_datalist(html_content))
+        results.append(("extract_datalist", len(datalist), elapsed, peak))
+
+        def load_and_filter():
+            stream = processor.iter_datalist(session, server.url1, min_date=TARGET_DATE,
+                                             prefetch_pages=args.prefetch, max_pages=max_pages)
+            filtered = processor.filter_data(stream, TARGET_DATE, "date", -1)
+            stream.close()
+            return filtered
+        filtered_data, elapsed, peak = measure(load_and_filter)
+        results.append(("iter_datalist+filter_data", len(filtered_data), elapsed, peak))
+
+        # 再次读取列表页：页面未变化，条件请求返回 304，直接复用上次的解析结果
+        _, elapsed, peak = measure(load_and_filter)
+        results.append(("iter_datalist(304)+filter", len(filtered_data), elapsed, peak))
+
+        # 以下每个阶段使用新的会话，不受前面阶段的条件请求记录影响
+        data_rows, elapsed, peak = measure(lambda: processor.fetch_and_format_data(
+            filtered_data, processor.new_session(), server.base_url, True, True, max_workers=args.workers
+        ))
+        results.append(("fetch_and_format_data", len(filtered_data), elapsed, peak))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, "bench.xlsx")
+            _, elapsed, peak = measure(lambda: writer.write(data_rows, output_path))
+            results.append(("ExcelWriter.write", len(filtered_data), elapsed, peak))
+
+            # 流式管线：详情页取到后立即格式化并写入，不保留完整的行列表
+            del data_rows
+            _, elapsed, peak = measure(lambda: writer.write(processor.iter_order_rows(
+                filtered_data, processor.new_session(), server.base_url, True, True, max_workers=args.workers
+            ), output_path))
+            results.append(("iter_order_rows→write", len(filtered_data), elapsed, peak))
+
+        requests_served = server.request_count
+        not_modified = server.not_modified_count
+        bytes_sent = server.bytes_sent
+    processor.shutdown()
+
+    return {
+        "orders": order_count,
+        "requests": requests_served,
+        "not_modified": not_modified,
+        "bytes_sent": bytes_sent,
+        "stages": [
+            {
+                "stage": name,
+                "count": count,
+                "seconds": round(elapsed, 4),
+                "items_per_second": round(count / elapsed, 1) if elapsed else None,
+                "peak_memory_kb": round(peak / 1024, 1),
+            }
+            for name, count, elapsed, peak in results
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线端到端基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="订单数量")
+    parser.add_argument("--latency-ms", type=float, default=5, help="模拟服务器每个请求的延迟")
+    parser.add_argument("--padding-bytes", type=int, default=20000, help="每个页面前后填充的 HTML 大小")
+    parser.add_argument("--page-size", type=int, default=100, help="列表页每页条数")
+    parser.add_argument("--workers", type=int, default=8, help="详情页并发线程数")
+    parser.add_argument("--prefetch", type=int, default=2, help="列表页预取页数")
+    parser.add_argument("--parse-processes", type=int, default=0, help="解析进程数，0 表示在线程中解析")
+    parser.add_argument("--parse-min-kb", type=int, default=64, help="进入进程池解析的最小页面大小")
+    parser.add_argument("--rate", type=float, default=0, help="每秒请求数上限，0 表示不限速")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    all_results = []
+    for order_count in args.sizes:
+        result = run_size(order_count, args)
+        all_results.append(result)
+        print(f"\n订单数 {order_count}（服务器请求 {result['requests']} 次，其中 304 {result['not_modified']} 次，"
+              f"传输 {result['bytes_sent'] / 1024:.0f} KB）")
+        print(f"  {'阶段':<28}{'耗时(s)':>10}{'条/秒':>12}{'峰值内存(KB)':>16}")
+        for stage in result["stages"]:
+            print(f"  {stage['stage']:<28}{stage['seconds']:>10.3f}"
+                  f"{stage['items_per_second'] or 0:>12.1f}{stage['peak_memory_kb']:>16.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": all_results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+从录制文件回放的端到端基准测试：不需要网络和登录，结果可重复。
+
+列表页 → 筛选 → 详情页 → Excel 写入的完整管线，在每个注入延迟下各运行一次。
+录制文件由 batchCli.py --record 生成；不指定 --fixture 时先从本地模拟服务器录制一份。
+
+用法:
+    python benchmarks/bench_replay.py --fixture fixtures/2025-01-15.jsonl.gz --date 2025-01-15
+                                      [--latency-ms 0 20 80] [--jitter-ms 0] [--workers 8]
+    python benchmarks/bench_replay.py --orders 1000 [--latency-ms 0 20 80]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataProcessor import DataProcessor  # noqa: E402
+from excelWriter import ExcelWriter  # noqa: E402
+from httpFixtures import FixtureArchive, start_recording, start_replay  # noqa: E402
+from stub_server import StubServer, SyntheticStore  # noqa: E402
+
+TARGET_DATE = date(2025, 1, 15)
+
+
+def http_options(args):
+    return {
+        "timeout": 30, "retries": 0, "backoff": 0.1, "rate_per_second": 0, "burst": args.workers,
+        "pool_size": args.workers + args.prefetch,
+    }
+
+
+def run_pipeline(processor, session, url1, base_url, target, args, output_path):
+    """运行完整管线，返回 (订单数, 失败数)"""
+    stream = processor.iter_datalist(session, url1, min_date=target,
+                                     prefetch_pages=args.prefetch, max_pages=args.max_pages)
+    filtered_data = processor.filter_data(stream, target, "date", -1)
+    stream.close()
+    failures = []
+    ExcelWriter().write(processor.iter_order_rows(
+        filtered_data, session, base_url, True, True, max_workers=args.workers, failures=failures
+    ), output_path)
+    return len(filtered_data), len(failures)
+
+
+def record_stub_fixture(path, args):
+    """从本地模拟服务器录制一份录制文件，返回 (url1, base_url)"""
+    store = SyntheticStore(args.orders, TARGET_DATE)
+    processor = DataProcessor(snapshot_max_age=0, http_options=http_options(args))
+    with StubServer(store, page_size=args.page_size) as server, tempfile.TemporaryDirectory() as temp_dir:
+        session = processor.new_session()
+        archive = start_recording(session, meta={"url1": server.url1, "base_url": server.base_url})
+        run_pipeline(processor, session, server.url1, server.base_url, TARGET_DATE, args,
+                     os.path.join(temp_dir, "record.xlsx"))
+        archive.save(path)
+        return server.url1, server.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从录制文件回放的端到端基准测试")
+    parser.add_argument("--fixture", help="录制文件；不指定时先从本地模拟服务器录制")
+    parser.add_argument("--date", type=date.fromisoformat, help="筛选日期 YYYY-MM-DD，使用 --fixture 时必填")
+    parser.add_argument("--orders", type=int, default=1000, help="未指定 --fixture 时模拟的订单数量")
+    parser.add_argument("--page-size", type=int, default=100, help="模拟服务器列表页每页条数")
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[0, 20, 80], help="每个请求注入的延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="在延迟上叠加 0 到该值的随机抖动")
+    parser.add_argument("--workers", type=int, default=8, help="详情页并发线程数")
+    parser.add_argument("--prefetch", type=int, default=2, help="列表页预取页数")
+    parser.add_argument("--max-pages", type=int, default=200, help="最多读取的列表页数")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    if args.fixture and not args.date:
+        parser.error("--fixture 需要与 --date 一起使用")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fixture_path = args.fixture
+        target = args.date or TARGET_DATE
+        if fixture_path is None:
+            fixture_path = os.path.join(temp_dir, "stub.jsonl.gz")
+            record_stub_fixture(fixture_path, args)
+            print(f"已从模拟服务器录制 {args.orders} 个订单（{os.path.getsize(fixture_path) / 1024:.0f} KB）")
+        meta = FixtureArchive.load(fixture_path).meta
+        url1, base_url = meta.get("url1", ""), meta.get("base_url", "")
+
+        results = []
+        for latency_ms in args.latency_ms:
+            processor = DataProcessor(snapshot_max_age=0, http_options=http_options(args))
+            session = processor.new_session()
+            adapter = start_replay(session, fixture_path, latency_ms, args.jitter_ms)
+            start = time.perf_counter()
+            order_count, failed = run_pipeline(processor, session, url1, base_url, target, args,
+                                               os.path.join(temp_dir, "replay.xlsx"))
+            elapsed = time.perf_counter() - start
+            processor.shutdown()
+            results.append({
+                "latency_ms": latency_ms,
+                "orders": order_count,
+                "failed": failed,
+                "requests": adapter.request_count,
+                "seconds": round(elapsed, 4),
+                "orders_per_second": round(order_count / elapsed, 1) if elapsed else None,
+            })
+
+    print(f"  {'延迟(ms)':<10}{'订单':>8}{'失败':>6}{'请求':>8}{'耗时(s)':>10}{'订单/秒':>10}")
+    for result in results:
+        print(f"  {result['latency_ms']:<10g}{result['orders']:>8}{result['failed']:>6}{result['requests']:>8}"
+              f"{result['seconds']:>10.3f}{result['orders_per_second'] or 0:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
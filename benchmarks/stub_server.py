@@ -0,0 +1,199 @@
+"""
+本地模拟销售系统，用于离线基准测试。
+
+提供与真实系统结构相同的两个页面：
+    /sales/document/index?page=N        列表页，含 var datalist = [...];
+    /sales/document/document?id=ID      详情页，含 var data = {...};
+
+订单数据由种子确定性生成，可配置每页条数、响应延迟和页面填充大小。
+与真实服务器一样支持 gzip 压缩和基于 ETag 的条件请求（If-None-Match → 304）。
+"""
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+INDEX_PATH = "/sales/document/index"
+DOCUMENT_PATH = "/sales/document/document"
+
+
+class SyntheticStore:
+    """确定性生成的订单集合；所有订单的 Created 都落在 target_date 当天，按时间倒序排列"""
+
+    def __init__(self, order_count, target_date, items_per_order=3, seed=1):
+        self.order_count = order_count
+        self.target_date = target_date
+        self.items_per_order = items_per_order
+        self.seed = seed
+        start = datetime.combine(target_date, datetime.max.time()).replace(microsecond=0)
+        step = 86399 / max(order_count, 1)
+        self.datalist = [
+            {
+                "OriginalID": 100000 + index,
+                "Number": f"S{index:06d}",
+                "UserName": f"sales{index % 7}",
+                "FirstName": f"First{index}",
+                "LastName": f"Last{index}",
+                "Created": (start - timedelta(seconds=int(index * step))).strftime("%Y-%m-%d %H:%M:%S"),
+                "finished": index % 2,
+            }
+            for index in range(order_count)
+        ]
+        # 最后再追加一页更早的订单，用于验证提前停止翻页
+        older = target_date - timedelta(days=1)
+        self.datalist.extend(
+            {
+                "OriginalID": 900000 + index,
+                "Number": f"O{index:06d}",
+                "UserName": "old",
+                "FirstName": "Old",
+                "LastName": "Order",
+                "Created": f"{older} 12:00:00",
+                "finished": 1,
+            }
+            for index in range(10)
+        )
+        self.ids = {item["OriginalID"] for item in self.datalist}
+
+    def detail(self, original_id):
+        """生成某个订单的 var data 内容"""
+        rng = random.Random(self.seed * 1000003 + original_id)
+        return {
+            "OriginalID": original_id,
+            "PhoneCell": f"514{rng.randint(1000000, 9999999)}",
+            "PhoneHome": "",
+            "PhoneOffice": f"438{rng.randint(1000000, 9999999)}" if rng.random() < 0.3 else "",
+            "items": [
+                {
+                    "VendorPLU": f"PLU-{rng.randint(1, 500):04d}",
+                    "VendorName": f"Vendor {rng.randint(1, 40)}",
+                    "Qty": str(rng.choice([1, 1, 1, 2, 3, -1])),
+                    "Qty_OH": str(rng.randint(0, 6)),
+                }
+                for _ in range(self.items_per_order)
+            ],
+        }
+
+
+class StubServer:
+    """在后台线程中运行的模拟服务器"""
+
+    def __init__(self, store, page_size=100, latency_ms=0, padding_bytes=20000, host="127.0.0.1", port=0):
+        self.store = store
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.padding = "<div class=\"filler\">" + "x" * max(padding_bytes - 30, 0) + "</div>\n"
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url1(self):
+        return f"{self.base}{INDEX_PATH}?page=1"
+
+    @property
+    def base_url(self):
+        return f"{self.base}{DOCUMENT_PATH}?id="
+
+    def render_index(self, page):
+        start = (page - 1) * self.page_size
+        items = self.store.datalist[start:start + self.page_size]
+        return (
+            f"<html><body>{self.padding}<script>\n"
+            f"var datalist = {json.dumps(items, ensure_ascii=False)};\nvar page = {page};\n"
+            f"</script>{self.padding}</body></html>"
+        )
+
+    def render_document(self, original_id):
+        data = self.store.detail(original_id)
+        return (
+            f"<html><body>{self.padding}<script>\n"
+            f"var data = {json.dumps(data, ensure_ascii=False)};\n"
+            f"</script>{self.padding}</body></html>"
+        )
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.request_count += 1
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                body = None
+                if parts.path == INDEX_PATH:
+                    body = server.render_index(int(query.get("page", ["1"])[0]))
+                elif parts.path == DOCUMENT_PATH:
+                    original_id = int(query.get("id", ["0"])[0])
+                    if original_id in server.store.ids:
+                        body = server.render_document(original_id)
+
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = body.encode("utf-8")
+                etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    payload = gzip.compress(payload, compresslevel=5)
+                with server.lock:
+                    server.bytes_sent += len(payload)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
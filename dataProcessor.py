@@ -1,113 +1,656 @@
-import requests
-from selenium import webdriver
-from PyQt5.QtWidgets import QMessageBox
-import re
+import os
 import json
-from datetime import datetime
+import time
+import threading
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
+from collections import Counter, deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import scriptExtractor
+from orderRecords import MIN_STOCK_LEFT, OrderHeader, OrderItem, SEPARATOR, parse_quantity
+from datalistIndex import DatalistIndex
+
+# selenium、requests 和 PyQt5 的弹窗在首次使用时才导入，不拖慢窗口启动
+
+
+def http_options_from_config(config):
+    """从 config.json 读取 HttpSession 的参数"""
+    return {
+        "timeout": config.get("http_timeout", 20),
+        "retries": config.get("http_retries", 3),
+        "backoff": config.get("http_backoff", 0.5),
+        "rate_per_second": config.get("http_rate_per_second", 10),
+        "burst": config.get("http_burst", 10),
+        # 详情页线程和列表页预取线程共用连接池
+        "pool_size": config.get("fetch_workers", 1) + config.get("prefetch_pages", 2),
+        # 记录 ETag / Last-Modified 的 URL 数，0 表示不发送条件请求
+        "conditional_cache_entries": config.get("http_conditional_cache_entries", 100),
+    }
+
+
+def target_label(target):
+    """目标（日期、单号、销售或 (销售, 开始日期, 结束日期)）在文件名和工作表名中的写法"""
+    if isinstance(target, tuple):
+        return "_".join(str(part) for part in target)
+    return str(target)
+
+
+class OperationCancelled(Exception):
+    """用户取消了正在进行的操作"""
 
 
 class DataProcessor:
-    def get_authenticated_session(self, login_url):
-        """使用 Selenium 登录并返回已认证的 Requests 会话"""
-        driver = webdriver.Chrome()
-        driver.get(login_url)
-        QMessageBox.information(None, "提示", "请在浏览器中完成登录后点击确定继续。")
+    def __init__(self, snapshot_max_age=300, http_options=None, parse_processes=0, parse_process_min_bytes=64 * 1024):
+        # 第一页 datalist 的短期快照 (页面 URL, datalist, 获取时间)，
+        # 登录时解析的列表页在有效期内可直接用于生成，避免重复请求
+        self.snapshot_max_age = snapshot_max_age
+        self.datalist_snapshot = None
+        # 创建 HttpSession 的参数（超时、重试、限速、连接池大小）
+        self.http_options = http_options or {}
+        # 当前运行的 RunProfiler，为 None 时不计时
+        self.profiler = None
+        # parse_processes > 0 时，不小于 parse_process_min_bytes 的页面在进程池中解析，
+        # 解析不再占用 GIL，下载线程可以继续工作；进程池在第一次使用时创建
+        self.parse_processes = parse_processes
+        self.parse_process_min_bytes = parse_process_min_bytes
+        self.parse_pool = None
+        self.parse_pool_lock = threading.Lock()
+
+    def stage(self, name):
+        """返回阶段计时上下文，未启用计时时不做任何事"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
+
+    def new_session(self):
+        """创建带重试、超时和限速的 HTTP 会话"""
+        from httpClient import HttpSession
+        return HttpSession(**self.http_options)
 
-        cookies = driver.get_cookies()
-        driver.quit()
+    def get_authenticated_session(self, login_url, wait_for_login=None):
+        """
+        使用 Selenium 登录并返回已认证的 Requests 会话
 
-        session = requests.Session()
+        wait_for_login 为阻塞直到用户在浏览器中完成登录的回调；
+        未提供时直接弹出提示框等待（只能在 GUI 线程中调用）。
+        """
+        with self.stage("启动浏览器"):
+            from selenium import webdriver
+            driver = webdriver.Chrome()
+        # 等待登录失败或被取消时也要关闭浏览器，不留下 Chrome 进程
+        try:
+            driver.get(login_url)
+            if wait_for_login is not None:
+                wait_for_login()
+            else:
+                from PyQt5.QtWidgets import QMessageBox
+                QMessageBox.information(None, "提示", "请在浏览器中完成登录后点击确定继续。")
+            cookies = driver.get_cookies()
+        finally:
+            with self.stage("关闭浏览器"):
+                driver.quit()
+
+        session = self.new_session()
         for cookie in cookies:
             session.cookies.set(cookie['name'], cookie['value'])
         return session
 
+    def save_session_cookies(self, session, cookie_path):
+        """将会话的 cookie 保存到本地文件，下次启动时复用"""
+        cookies = [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+            for cookie in session.cookies
+        ]
+        with open(cookie_path, "w", encoding="utf-8") as f:
+            json.dump(cookies, f, ensure_ascii=False)
+
+    def load_saved_session(self, cookie_path):
+        """从本地 cookie 文件恢复会话，文件不存在或损坏时返回 None"""
+        if not os.path.exists(cookie_path):
+            return None
+        try:
+            with open(cookie_path, "r", encoding="utf-8") as f:
+                cookies = json.load(f)
+            session = self.new_session()
+            for cookie in cookies:
+                session.cookies.set(cookie["name"], cookie["value"],
+                                    domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+            return session
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"无法读取已保存的 cookie: {e}")
+            return None
+
+    def parse_page(self, parser, html_content):
+        """
+        用 scriptExtractor 中的 parser 解析页面。
+
+        启用进程池且页面足够大时在子进程中解析，只回传精简后的结果；
+        调用线程等待结果时不持有 GIL。
+        """
+        if not self.parse_processes or len(html_content) < self.parse_process_min_bytes:
+            return parser(html_content)
+        with self.parse_pool_lock:
+            if self.parse_pool is None:
+                self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_processes)
+            pool = self.parse_pool
+        return pool.submit(parser, html_content).result()
+
+    def shutdown(self):
+        """关闭解析进程池"""
+        with self.parse_pool_lock:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+
+    def fetch_page(self, session, url, parser, request_stage, parse_stage, conditional=True):
+        """
+        请求并解析页面。
+
+        conditional 为 True 且会话记录了该 URL 的 ETag / Last-Modified 时发送条件请求，
+        服务器返回 304 时直接返回上次的解析结果，不再解码和解析页面。
+        详情页传入 False：详情已有 DetailCache / OrderStore，不在会话内存中重复保留。
+        """
+        validators = getattr(session, "validators", None) if conditional else None
+        with self.stage(request_stage):
+            if validators is not None:
+                response = session.get(url, headers=validators.request_headers(url))
+                if response.status_code == 304:
+                    cached = validators.cached_result(url)
+                    if cached is not None:
+                        return cached
+                    # 解析结果已被淘汰，重新完整请求
+                    response = session.get(url)
+            else:
+                response = session.get(url)
+            response.raise_for_status()
+            html_content = response.text
+        with self.stage(parse_stage):
+            result = self.parse_page(parser, html_content)
+        if validators is not None:
+            validators.remember(url, response, result)
+        return result
+
     def extract_datalist(self, html_content):
         """从 HTML 中提取 datalist 数据"""
-        match = re.search(r"var\s+datalist\s*=\s*(\[.*?\]);", html_content, re.DOTALL)
-        if not match:
+        return scriptExtractor.extract_datalist(html_content)
+
+    def fetch_default_order_number(self, session, url1):
+        """从 URL1 的 datalist 提取第一个字典的 Number 值"""
+        if not url1:
+            return "URL错误"
+
+        response = None
+        try:
+            response = session.get(url1)  # 使用已登录的 session
+            response.raise_for_status()
+
+            # 尝试解析 datalist 数据
+            datalist = self.parse_page(scriptExtractor.parse_index_page, response.text)
+            if datalist and isinstance(datalist, list):
+                self.store_datalist_snapshot(self.build_page_url(url1, 1), datalist)
+                first_item = datalist[0]
+                if "Number" in first_item:
+                    return first_item["Number"]
+        except Exception as e:
+            print(f"无法获取默认单号: {e}")
+
+        # 解析失败，打印 HTML 源代码的第 100-150 行
+        try:
+            lines = response.text.splitlines()  # 分割 HTML 为按行的列表
+            snippet = "\n".join(lines[99:150])  # 提取第 100-150 行
+            print("网页源代码 (第 100-150 行):")
+            print(snippet)
+        except Exception as inner_e:
+            print(f"无法打印网页源代码: {inner_e}")
+
+        return "解析错误"
+
+    def check_cancelled(self, cancel_event):
+        """若已请求取消则抛出 OperationCancelled"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise OperationCancelled("操作已取消")
+
+    def build_page_url(self, url1, page):
+        """将 url1 中的 page 参数替换为指定页码，没有 page 参数时自动追加"""
+        parts = urlsplit(url1)
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "page"]
+        query.append(("page", str(page)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def store_datalist_snapshot(self, page_url, datalist):
+        """记录第一页 datalist 的快照"""
+        self.datalist_snapshot = (page_url, datalist, time.time())
+
+    def clear_datalist_snapshot(self):
+        """丢弃快照，下次生成时重新请求列表页"""
+        self.datalist_snapshot = None
+
+    def take_datalist_snapshot(self, page_url):
+        """取出仍在有效期内且 URL 相同的快照 datalist 并丢弃快照（只用一次），否则返回 None"""
+        snapshot = self.datalist_snapshot
+        self.datalist_snapshot = None
+        if snapshot is None:
+            return None
+        snapshot_url, datalist, fetched_at = snapshot
+        if snapshot_url != page_url or time.time() - fetched_at > self.snapshot_max_age:
+            return None
+        return datalist
+
+    def snapshot_time(self):
+        """返回快照的获取时间戳，没有快照时返回 None"""
+        snapshot = self.datalist_snapshot
+        return snapshot[2] if snapshot is not None else None
+
+    def fetch_datalist_page(self, session, url1, page):
+        """请求指定页的列表页并解析 datalist，解析失败返回空列表"""
+        page_url = self.build_page_url(url1, page)
+        return self.fetch_page(session, page_url, scriptExtractor.parse_index_page, "列表页请求", "列表页解析")
+
+    def iter_page_items(self, page_items, min_date, yielded_ids):
+        """产出一页中尚未产出过的项；返回该页是否出现了早于 min_date 的订单"""
+        reached_older = False
+        for item in page_items:
+            if min_date is not None and "Created" in item:
+                created = datetime.strptime(item["Created"], "%Y-%m-%d %H:%M:%S").date()
+                if created < min_date:
+                    reached_older = True
+            original_id = item.get("OriginalID")
+            if original_id is not None:
+                if original_id in yielded_ids:
+                    continue
+                yielded_ids.add(original_id)
+            yield item
+        return reached_older
+
+    def iter_datalist(self, session, url1, min_date=None, prefetch_pages=2, max_pages=50,
+                      progress=None, cancel_event=None, use_snapshot=False):
+        """
+        按 page=1, 2, 3... 逐页流式产出 datalist 中的每一项。
+
+        后台线程预取后续 prefetch_pages 页；某页出现早于 min_date 的 Created 时，
+        产出该页后停止翻页。遇到空页或达到 max_pages 时同样停止。
+        每取完一页调用 progress("pages", 已取页数, 0)。
+        各页请求的时间不同，期间新增的订单会把后面的订单挤到下一页，
+        同一订单可能出现在相邻两页中，按 OriginalID 只产出第一次出现的项。
+
+        use_snapshot 为 True 时第一页先使用登录时保存的快照（只用一次）。快照不会与实时的后续页拼接：
+        提供 min_date 时只有快照本身已翻到更早的订单才使用，否则整个列表实时读取；
+        没有 min_date（按单号）时先扫描快照，需要后面的页时从第一页开始重新实时读取，已产出的订单不会重复。
+        """
+        yielded_ids = set()
+        snapshot = self.take_datalist_snapshot(self.build_page_url(url1, 1)) if use_snapshot else None
+        if snapshot and min_date is not None and not any(
+                "Created" in item and datetime.strptime(item["Created"], "%Y-%m-%d %H:%M:%S").date() < min_date
+                for item in snapshot):
+            snapshot = None
+        if snapshot:
+            if (yield from self.iter_page_items(snapshot, min_date, yielded_ids)):
+                return
+
+        executor = ThreadPoolExecutor(max_workers=max(prefetch_pages, 1))
+        pending = deque()
+        next_page = 1
+        try:
+            while pending or next_page <= max_pages:
+                # 保持预取窗口填满
+                while next_page <= max_pages and len(pending) < max(prefetch_pages, 1):
+                    pending.append(executor.submit(self.fetch_datalist_page, session, url1, next_page))
+                    next_page += 1
+
+                self.check_cancelled(cancel_event)
+                page_items = pending.popleft().result()
+                pages_done = next_page - len(pending) - 1
+                if progress is not None:
+                    progress("pages", pages_done, 0)
+                if not page_items:
+                    break
+                if (yield from self.iter_page_items(page_items, min_date, yielded_ids)):
+                    break
+        finally:
+            # 提前结束时取消尚未开始的预取请求
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def sync_order_store(self, session, url1, store, resync_days=7, min_date=None, prefetch_pages=2, max_pages=50,
+                         progress=None, cancel_event=None):
+        """
+        增量同步列表页到本地订单库 (OrderStore)，返回本次写入的订单数。
+
+        列表页按 Created 倒序，只翻到库中最新订单日期往前 resync_days 天为止，
+        提供 min_date 时至少翻到该日期；库为空且没有 min_date 时最多同步 max_pages 页。
+        resync_days 为 0 时不复查更早的订单，只翻到最新订单日期和 min_date 中较早的一天。
+        同步覆盖的最早日期记录在订单库中（OrderStore.synced_from），此后的订单及其 finished 与列表页一致。
+        """
+        start_date = store.sync_start_date(resync_days)
+        if min_date is not None:
+            start_date = min_date if start_date is None else min(start_date, min_date)
+        datalist = self.iter_datalist(session, url1, min_date=start_date,
+                                      prefetch_pages=prefetch_pages, max_pages=max_pages,
+                                      progress=progress, cancel_event=cancel_event)
+        synced = 0
+        oldest = None
+        batch = []
+        for item in datalist:
+            created_date = (item.get("Created") or "")[:10]
+            if created_date and (oldest is None or created_date < oldest):
+                oldest = created_date
+            batch.append(item)
+            if len(batch) >= 500:
+                synced += store.upsert_orders(batch)
+                batch = []
+        synced += store.upsert_orders(batch)
+
+        # 翻到了早于 start_date 的订单时覆盖到 start_date；否则翻页在 max_pages 处停止，
+        # 最早那一天可能只同步了一部分，只算到它的后一天
+        if oldest is not None and start_date is not None and date.fromisoformat(oldest) < start_date:
+            synced_from = start_date
+        elif oldest is not None:
+            synced_from = date.fromisoformat(oldest) + timedelta(days=1)
+        else:
+            synced_from = start_date or date.today()
+        store.set_meta("synced_from", synced_from.isoformat())
+        store.set_meta("last_sync_at", datetime.now().isoformat(timespec="seconds"))
+        return synced
+
+    def query_order_store(self, store, target, mode, finished_filter):
+        """
+        从本地订单库筛选订单，结果与 filter_data 相同。
+
+        除 date 和 orderNumber 外还支持 salesperson 模式，target 为 (销售, 开始日期, 结束日期)。
+        目标早于最近一次同步覆盖的范围时，库中的订单和 finished 可能已过期，返回 None，
+        调用方应改为从列表页筛选；单号在库中找不到或早于同步范围时同样返回 None。
+        """
+        synced_from = store.synced_from()
+        if synced_from is None:
             return None
-        return json.loads(match.group(1))
+        if mode == "date":
+            if target < synced_from:
+                return None
+            items = store.find_by_date(target, finished_filter)
+        elif mode == "orderNumber":
+            items = store.find_by_number(target)[:1]
+            if not items or (items[0]["Created"] or "")[:10] < synced_from.isoformat():
+                return None
+            if finished_filter in [0, 1] and items[0]["finished"] != finished_filter:
+                items = []
+        elif mode == "salesperson":
+            user_name, start_date, end_date = target
+            if start_date < synced_from:
+                return None
+            items = store.find_by_salesperson(user_name, start_date, end_date, finished_filter)
+        else:
+            raise ValueError(f"未知模式: {mode}")
+        return [self.order_summary(item, mode) for item in items]
+
+    def filter_targets(self, datalist, targets, mode, finished_filter):
+        """
+        一次读取 datalist，按多个目标筛选，返回 {目标: 筛选结果}。
+
+        多个目标时先建立 DatalistIndex，每个目标只是一次查表；单个目标时保持流式筛选（单号找到即停止翻页）。
+        """
+        if len(targets) > 1 and not isinstance(datalist, DatalistIndex):
+            datalist = DatalistIndex(datalist)
+        return {target: self.filter_data(datalist, target, mode, finished_filter) for target in targets}
+
+    def group_by_salesperson(self, filtered_by_target):
+        """将多个目标的筛选结果按销售重新分组，同一订单只保留一次；返回按销售排序的 {销售: 订单}"""
+        groups = {}
+        seen = set()
+        for filtered_data in filtered_by_target.values():
+            for data in filtered_data:
+                if data["OriginalID"] in seen:
+                    continue
+                seen.add(data["OriginalID"])
+                groups.setdefault(data.get("UserName") or "未知销售", []).append(data)
+        return dict(sorted(groups.items()))
 
     def filter_data(self, datalist, target, mode, finished_filter):
-        """根据模式和条件筛选数据"""
+        """
+        根据模式和条件筛选数据。
+
+        datalist 可以是列表、iter_datalist 产生的流，或 DatalistIndex；
+        传入 DatalistIndex 时直接按日期 / 单号查表，不再逐项解析和扫描。
+        """
+        if mode not in ("date", "orderNumber"):
+            raise ValueError(f"未知模式: {mode}")
+
+        if isinstance(datalist, DatalistIndex):
+            if mode == "date":
+                return [self.order_summary(item, mode) for item in datalist.lookup_date(target, finished_filter)]
+            matches = datalist.lookup_number(target, finished_filter)
+            return [self.order_summary(matches[0], mode)] if matches else []
+
         if mode == "date":
             return [
-                {
-                    "OriginalID": item["OriginalID"],
-                    "UserName": item.get("UserName", "无此字段"),
-                    "FirstName": item.get("FirstName", "无此字段"),
-                    "LastName": item.get("LastName", "无此字段"),
-                    "Number": item.get("Number", "无此字段"),
-                    "Created": item["Created"]
-                }
+                self.order_summary(item, mode)
                 for item in datalist
                 if (finished_filter not in [0, 1] or item.get("finished") == finished_filter)
                 and "Created" in item
                 and datetime.strptime(item["Created"], "%Y-%m-%d %H:%M:%S").date() == target
             ]
-        elif mode == "orderNumber":
-            return [
-                {
-                    "OriginalID": item["OriginalID"],
-                    "UserName": item.get("UserName", "无此字段"),
-                    "FirstName": item.get("FirstName", "无此字段"),
-                    "LastName": item.get("LastName", "无此字段"),
-                    "Number": item.get("Number", "无此字段")
-                }
-                for item in datalist
-                if (finished_filter not in [0, 1] or item.get("finished") == finished_filter)
-                and item.get("Number") == target
-            ]
-        else:
-            raise ValueError(f"未知模式: {mode}")
 
-    def fetch_and_format_data(self, filtered_data, session, base_url, include_stock_status, skip_negative_qty):
-        """根据筛选后的数据提取详细信息并格式化为 Excel 行"""
-        data_rows = []
-        for data in filtered_data:
-            original_id = data["OriginalID"]
-            url2 = f"{base_url}{original_id}"
+        # 单号唯一，找到后立即停止，避免流式加载继续翻页
+        for item in datalist:
+            if (finished_filter not in [0, 1] or item.get("finished") == finished_filter) \
+                    and item.get("Number") == target:
+                return [self.order_summary(item, mode)]
+        return []
+
+    def order_summary(self, item, mode):
+        """从 datalist 项中提取生成所需的字段"""
+        summary = {
+            "OriginalID": item["OriginalID"],
+            "UserName": item.get("UserName", "无此字段"),
+            "FirstName": item.get("FirstName", "无此字段"),
+            "LastName": item.get("LastName", "无此字段"),
+            "Number": item.get("Number", "无此字段"),
+            "finished": item.get("finished")
+        }
+        if mode in ("date", "salesperson"):
+            summary["Created"] = item["Created"]
+        return summary
+
+    def fetch_and_format_data(self, filtered_data, session, base_url, include_stock_status, skip_negative_qty, max_workers=1,
+                              progress=None, cancel_event=None, cache=None, failures=None):
+        """根据筛选后的数据提取详细信息并格式化为 Excel 行，返回完整的行列表（参数同 iter_order_rows）"""
+        return list(self.iter_order_rows(filtered_data, session, base_url, include_stock_status, skip_negative_qty,
+                                         max_workers, progress, cancel_event, cache, failures))
+
+    def iter_order_rows(self, filtered_data, session, base_url, include_stock_status, skip_negative_qty, max_workers=1,
+                        progress=None, cancel_event=None, cache=None, failures=None):
+        """
+        根据筛选后的数据逐个订单获取详情，并立即产出该订单的 Excel 行。
+
+        max_workers > 1 时使用线程池并发请求详情页，共用同一个已认证的 session，
+        输出行的顺序仍与 filtered_data 保持一致；已产出的行不在这里保留，内存占用与订单总数无关。
+        每完成一个订单调用 progress("orders", 已完成数, 总数)；cancel_event 被设置后抛出 OperationCancelled。
+        提供 cache (DetailCache) 时，命中缓存的订单不再请求详情页。
+        提供 failures 列表时，重试后仍失败的订单会追加到其中，供调用方汇总提示。
+        """
+        total = len(filtered_data)
+        errors = {}
+        details = self.iter_order_details(filtered_data, session, base_url, max_workers, cancel_event, cache, errors)
+        for index, (data, data_content) in enumerate(zip(filtered_data, details), 1):
+            if progress is not None:
+                progress("orders", index, total)
+            if data_content is None:
+                self.record_failure(failures, data, errors)
+                continue
             try:
-                response2 = session.get(url2)
-                response2.raise_for_status()
-                match_data = re.search(r"var\s+data\s*=\s*(\{.*?\});", response2.text, re.DOTALL)
-                if not match_data:
-                    continue
-                data_content = json.loads(match_data.group(1))
-
-                # 格式化基础数据
-                phone_combined = self.combine_phone_numbers(data_content)
-                data_row = [
-                    "", data["UserName"], data["Number"], "", "", "", "",
-                    f"{data['FirstName']} {data['LastName']}", phone_combined, "", "", "", ""
-                ]
-                data_rows.append(data_row)
-
-                # 格式化详细项目数据
-                items = data_content.get("items", [])
-                if skip_negative_qty:
-                    items = [item for item in items if float(item.get("Qty", 0)) >= 0]
-                for item in items:
-                    qty = float(item.get("Qty", 0))
-                    qty_oh = float(item.get("Qty_OH", 0))
-                    stock_status = ""
-                    # 仅在用户选择生成订货列时计算订货状态
-                    if include_stock_status:
-                        stock_status = "现货" if qty_oh - qty >= 1 else "需要订货"
-
-                    item_row = [
-                        "", "", "", "", item.get("VendorPLU", ""), item.get("VendorName", ""),
-                        item.get("Qty", ""), "", "", "", "", "", stock_status if include_stock_status else ""
-                    ]
-                    data_rows.append(item_row)
-
-                # 添加空行分隔订单
-                data_rows.append(["" for _ in range(13)])
+                data_rows = self.format_order_rows(data, data_content, include_stock_status, skip_negative_qty)
             except Exception as e:
                 print(f"提取数据失败: {str(e)}")
+                errors[data["OriginalID"]] = str(e)
+                self.record_failure(failures, data, errors)
                 continue
-        return data_rows
+            yield from data_rows
+
+    def record_failure(self, failures, data, errors):
+        """将处理失败的订单追加到 failures 汇总列表"""
+        if failures is None:
+            return
+        failures.append({
+            "OriginalID": data["OriginalID"],
+            "Number": data.get("Number", ""),
+            "UserName": data.get("UserName", ""),
+            "error": errors.get(data["OriginalID"], "未知错误")
+        })
+
+    def fetch_and_format_targets(self, filtered_by_target, session, base_url, include_stock_status, skip_negative_qty,
+                                 max_workers=1, progress=None, cancel_event=None, cache=None, failures=None):
+        """
+        一次处理多个目标（日期或单号）的筛选结果，返回 {目标: Excel 行生成器}。
+
+        各目标的行生成器必须按字典顺序依次消费（如 ExcelWriter.write_sheets）。
+        所有目标中的订单按 OriginalID 只请求一次详情页；同一订单出现在多个目标中时，
+        其详情只保留到最后一个引用它的目标处理完为止。
+        失败的订单（每个 OriginalID 一次）追加到 failures 列表。
+        """
+        remaining = Counter(data["OriginalID"] for filtered_data in filtered_by_target.values() for data in filtered_data)
+        total = len(remaining)
+        shared = {}  # 仍被后续目标引用的订单详情（失败的订单为 None）
+        completed = [0]
+        errors = {}
+
+        def iter_target_rows(filtered_data):
+            new_orders = {}
+            for data in filtered_data:
+                if data["OriginalID"] not in shared:
+                    new_orders.setdefault(data["OriginalID"], data)
+            details = self.iter_order_details(list(new_orders.values()), session, base_url, max_workers,
+                                              cancel_event, cache, errors)
+            for data in filtered_data:
+                original_id = data["OriginalID"]
+                if original_id in shared:
+                    data_content = shared[original_id]
+                else:
+                    data_content = next(details)
+                    completed[0] += 1
+                    if progress is not None:
+                        progress("orders", completed[0], total)
+                    if data_content is None:
+                        self.record_failure(failures, data, errors)
+                remaining[original_id] -= 1
+                if remaining[original_id] > 0:
+                    shared[original_id] = data_content
+                else:
+                    shared.pop(original_id, None)
+
+                if data_content is None:
+                    continue
+                try:
+                    data_rows = self.format_order_rows(data, data_content, include_stock_status, skip_negative_qty)
+                except Exception as e:
+                    print(f"提取数据失败: {str(e)}")
+                    # 同一订单出现在多个目标中时只记录一次
+                    if original_id not in errors:
+                        errors[original_id] = str(e)
+                        self.record_failure(failures, data, errors)
+                    continue
+                yield from data_rows
+
+        return {target: iter_target_rows(filtered_data) for target, filtered_data in filtered_by_target.items()}
+
+    def iter_order_details(self, filtered_data, session, base_url, max_workers=1, cancel_event=None, cache=None, errors=None):
+        """
+        按 filtered_data 的顺序逐个产出订单详情，优先使用缓存，未命中的订单才请求详情页。
+
+        max_workers > 1 时由线程池请求详情页，最多提前 max_workers * 2 个订单，
+        已产出的详情不再保留，内存占用与订单总数无关。
+        """
+        def cached_detail(data):
+            if cache is None:
+                return None
+            return cache.get(data["OriginalID"], data.get("finished"))
 
+        def store_detail(data, data_content):
+            if cache is not None and data_content is not None:
+                cache.put(data["OriginalID"], data_content, data.get("finished"))
+
+        if not (max_workers and max_workers > 1):
+            for data in filtered_data:
+                self.check_cancelled(cancel_event)
+                data_content = cached_detail(data)
+                if data_content is None:
+                    data_content = self.fetch_order_detail(session, base_url, data["OriginalID"], errors)
+                    store_detail(data, data_content)
+                yield data_content
+            return
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        window = max_workers * 2
+        pending = deque()  # (订单, 缓存的详情, 请求详情页的 future)
+        orders = iter(filtered_data)
+        try:
+            while True:
+                # 保持预取窗口填满
+                while len(pending) < window:
+                    data = next(orders, None)
+                    if data is None:
+                        break
+                    data_content = cached_detail(data)
+                    future = None
+                    if data_content is None:
+                        future = executor.submit(self.fetch_order_detail, session, base_url, data["OriginalID"], errors)
+                    pending.append((data, data_content, future))
+                if not pending:
+                    break
+
+                # 按提交顺序取结果，保证 Excel 行顺序不变
+                self.check_cancelled(cancel_event)
+                data, data_content, future = pending.popleft()
+                if future is not None:
+                    data_content = future.result()
+                    store_detail(data, data_content)
+                yield data_content
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=False)
+
+    def fetch_order_detail(self, session, base_url, original_id, errors=None):
+        """请求单个订单详情页并解析 var data，失败时返回 None 并把原因记录到 errors[original_id]"""
+        url2 = f"{base_url}{original_id}"
+        try:
+            data_content = self.fetch_page(session, url2, scriptExtractor.parse_document_page, "详情页请求", "详情页解析",
+                                           conditional=False)
+            if data_content is None and errors is not None:
+                errors[original_id] = "详情页中未找到 var data"
+            return data_content
+        except Exception as e:
+            print(f"提取数据失败: {str(e)}")
+            if errors is not None:
+                errors[original_id] = str(e)
+            return None
+
+    def format_order_rows(self, data, data_content, include_stock_status, skip_negative_qty):
+        """
+        将单个订单的详情转换为行记录：OrderHeader、每个产品一个 OrderItem，最后是分隔行 SEPARATOR。
+
+        列的排布只在 ExcelWriter 中决定；数量保持为数值。
+        """
+        data_rows = [OrderHeader(
+            data["UserName"], data["Number"],
+            f"{data['FirstName']} {data['LastName']}", self.combine_phone_numbers(data_content)
+        )]
+
+        for item in data_content.get("items", []):
+            qty = parse_quantity(item.get("Qty", 0))
+            if skip_negative_qty and qty < 0:
+                continue
+            qty_oh = parse_quantity(item.get("Qty_OH", 0))
+            stock_status = ""
+            # 仅在用户选择生成订货列时计算订货状态
+            if include_stock_status:
+                stock_status = "现货" if qty_oh - qty >= MIN_STOCK_LEFT else "需要订货"
+            data_rows.append(OrderItem(item.get("VendorPLU", ""), item.get("VendorName", ""), qty, qty_oh, stock_status))
+
+        # 添加空行分隔订单
+        data_rows.append(SEPARATOR)
+        return data_rows
 
     def combine_phone_numbers(self, data_content):
         """合并电话号码"""
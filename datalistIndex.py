@@ -0,0 +1,46 @@
+from datetime import date
+
+
+class DatalistIndex:
+    """
+    对一次获取的 datalist 建立索引，供多个目标重复筛选。
+
+    按 Created 日期和 Number 分组，并以 finished 作为二级键，
+    每种筛选组合都变成一次字典查找；各分组内保持 datalist 原有顺序。
+    """
+
+    def __init__(self, datalist):
+        self.items = list(datalist)
+        self.by_date = {}
+        self.by_date_finished = {}
+        self.by_number = {}
+        self.by_number_finished = {}
+
+        for item in self.items:
+            finished = item.get("finished")
+            if "Created" in item:
+                # Created 格式为 "%Y-%m-%d %H:%M:%S"，前 10 位即日期
+                created_date = date.fromisoformat(item["Created"][:10])
+                self.by_date.setdefault(created_date, []).append(item)
+                self.by_date_finished.setdefault((created_date, finished), []).append(item)
+            if "Number" in item:
+                self.by_number.setdefault(item["Number"], []).append(item)
+                self.by_number_finished.setdefault((item["Number"], finished), []).append(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def lookup_date(self, target, finished_filter=-1):
+        """返回指定日期的订单，finished_filter 为 0 或 1 时只返回对应完结状态的订单"""
+        if finished_filter in [0, 1]:
+            return self.by_date_finished.get((target, finished_filter), [])
+        return self.by_date.get(target, [])
+
+    def lookup_number(self, target, finished_filter=-1):
+        """返回指定单号的订单，finished_filter 为 0 或 1 时只返回对应完结状态的订单"""
+        if finished_filter in [0, 1]:
+            return self.by_number_finished.get((target, finished_filter), [])
+        return self.by_number.get(target, [])
@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import threading
+import time
+
+# 每写入这么多条记录检查一次大小和过期记录，长时间运行的 GUI 和后台服务不会无限增长
+EVICT_EVERY_PUTS = 200
+
+
+class DetailCache:
+    """
+    订单详情（详情页中 var data 的 JSON）的本地 SQLite 缓存，以 OriginalID 为键。
+
+    超过 ttl_seconds 的记录视为过期；缓存总大小超过 max_bytes 时淘汰最早写入的记录。
+    check_finished 为 True 时，列表页中 finished 标记与缓存时不同的订单视为已变更。
+    """
+
+    def __init__(self, path, ttl_seconds=24 * 3600, max_bytes=50 * 1024 * 1024, check_finished=True):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.check_finished = check_finished
+        self.puts_since_evict = 0
+        self.lock = threading.Lock()
+        # 生成流程在后台线程中运行，允许跨线程使用同一连接，由 lock 串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            "original_id TEXT PRIMARY KEY, finished INTEGER, payload TEXT NOT NULL, "
+            "size INTEGER NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_details_fetched_at ON details (fetched_at)")
+        self.conn.commit()
+        self.evict()
+
+    def get(self, original_id, finished=None):
+        """返回缓存的详情，不存在、过期或 finished 已变化时返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT finished, payload, fetched_at FROM details WHERE original_id = ?", (str(original_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        cached_finished, payload, fetched_at = row
+        if self.ttl_seconds and time.time() - fetched_at > self.ttl_seconds:
+            return None
+        if self.check_finished and finished is not None and cached_finished != finished:
+            return None
+        return json.loads(payload)
+
+    def put(self, original_id, data_content, finished=None):
+        """写入或覆盖一条详情缓存"""
+        payload = json.dumps(data_content, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO details (original_id, finished, payload, size, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (str(original_id), finished, payload, len(payload), time.time())
+            )
+            self.conn.commit()
+            self.puts_since_evict += 1
+            should_evict = self.puts_since_evict >= EVICT_EVERY_PUTS
+            if should_evict:
+                self.puts_since_evict = 0
+        if should_evict:
+            self.evict()
+
+    def invalidate(self, original_id):
+        """删除指定订单的缓存"""
+        with self.lock:
+            self.conn.execute("DELETE FROM details WHERE original_id = ?", (str(original_id),))
+            self.conn.commit()
+
+    def evict(self):
+        """删除过期记录，并在总大小超限时从最早的记录开始淘汰"""
+        with self.lock:
+            if self.ttl_seconds:
+                self.conn.execute("DELETE FROM details WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
+            if self.max_bytes:
+                self.conn.execute(
+                    "DELETE FROM details WHERE original_id IN ("
+                    "SELECT original_id FROM (SELECT original_id, SUM(size) OVER (ORDER BY fetched_at DESC) AS total "
+                    "FROM details) WHERE total > ?)",
+                    (self.max_bytes,)
+                )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
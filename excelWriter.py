@@ -0,0 +1,145 @@
+import re
+from dataProcessor import OperationCancelled
+from orderRecords import OrderHeader, OrderItem
+from shortageReport import SHORTAGE_SHEET, SHORTAGE_HEADERS
+
+# openpyxl 在第一次写入时才导入，不拖慢窗口启动
+
+# 写入 Excel 的列；电话不单独成列，而是写在订单下一行的顾客姓名位置
+EXCEL_HEADERS = ["空A", "销售", "单号", "空D", "产品型号", "供货商", "数量", "顾客姓名", "家具自提", "留言", "货期", "订货"]
+COLUMN = {header: index for index, header in enumerate(EXCEL_HEADERS)}
+# 所有工作表共用的列宽（未列出的列使用 Excel 默认宽度）
+COLUMN_WIDTHS = {"销售": 10, "单号": 14, "产品型号": 18, "供货商": 24, "数量": 6, "顾客姓名": 24, "订货": 10}
+SHORTAGE_COLUMN_WIDTHS = {"产品型号": 18, "供货商": 24}
+
+
+class ExcelWriter:
+    def write(self, data_rows, filename, progress=None, cancel_event=None, shortage_report=None):
+        """
+        单次流式写入 Excel 文件。
+
+        data_rows 是 DataProcessor.format_order_rows 产生的行记录，列的排布在 iter_excel_rows 中完成，
+        订单的电话写在下一行的 "顾客姓名" 列。使用 openpyxl 的 write-only 模式只保存一次，无需再读回文件处理。
+        data_rows 可以是生成器（如 DataProcessor.iter_order_rows），行在产出时立即写入。
+        每写入一行调用 progress("rows", 已写行数, 总行数)，总行数未知时为 0。
+        提供 shortage_report (ShortageReport) 时，在最后追加一个缺货汇总工作表。
+        """
+        self.write_sheets({"数据提取": data_rows}, filename, progress, cancel_event, shortage_report)
+
+    def write_sheets(self, rows_by_sheet, filename, progress=None, cancel_event=None, shortage_report=None):
+        """
+        将 {工作表名: 数据行} 写入同一个工作簿的多个工作表，只保存一次；各工作表的数据行按字典顺序依次消费。
+
+        提供 shortage_report 时汇总所有工作表中的产品行，写完订单后追加缺货汇总工作表。
+        """
+        from openpyxl import Workbook
+        from openpyxl.styles import Font
+        wb = Workbook(write_only=True)
+        header_font = Font(bold=True)  # 所有工作表的表头共用同一个样式
+
+        total = self.count_rows(rows_by_sheet.values())
+        written = 0
+        used_titles = set()
+        for sheet_name, data_rows in rows_by_sheet.items():
+            if shortage_report is not None:
+                data_rows = shortage_report.track(data_rows)
+            title = self.unique_sheet_title(sheet_name, used_titles)
+            ws = self.create_sheet(wb, title, EXCEL_HEADERS, COLUMN_WIDTHS, header_font)
+            for row in self.iter_excel_rows(data_rows):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelled("操作已取消")
+                ws.append(row)
+                written += 1
+                if progress is not None:
+                    progress("rows", written, total)
+
+        if shortage_report is not None:
+            ws = self.create_sheet(wb, SHORTAGE_SHEET, SHORTAGE_HEADERS, SHORTAGE_COLUMN_WIDTHS, header_font)
+            for row in shortage_report.shortages():
+                ws.append(row)
+        wb.save(filename)
+        print(f'文件已保存为 {filename}')
+
+    def append(self, data_rows, base_path, filename, progress=None, cancel_event=None):
+        """
+        在已有工作簿 base_path 的第一个工作表末尾追加订单行，另存为 filename。
+
+        重新读取时文件末尾的空白分隔行会被丢弃，追加前先补一行空行。
+        已有的缺货汇总只反映上次导出的订单，追加后不再准确，因此删除。
+        """
+        from openpyxl import load_workbook
+        wb = load_workbook(base_path)
+        if SHORTAGE_SHEET in wb.sheetnames:
+            del wb[SHORTAGE_SHEET]
+        ws = wb.worksheets[0]
+        if ws.max_row > 1:
+            ws.append([])
+
+        total = self.count_rows([data_rows])
+        for index, row in enumerate(self.iter_excel_rows(data_rows), 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled("操作已取消")
+            ws.append(row)
+            if progress is not None:
+                progress("rows", index, total)
+        wb.save(filename)
+        print(f'文件已追加保存为 {filename}')
+
+    def count_rows(self, row_sources):
+        """数据行都是列表时返回总行数，含生成器时返回 0（总数未知）"""
+        if all(isinstance(data_rows, (list, tuple)) for data_rows in row_sources):
+            return sum(len(data_rows) for data_rows in row_sources)
+        return 0
+
+    def create_sheet(self, wb, title, headers, column_widths, header_font):
+        """在 write-only 工作簿中创建工作表，设置列宽并写入加粗的表头"""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+        ws = wb.create_sheet(title)
+        # write-only 模式下列宽必须在写入第一行之前设置
+        for index, header in enumerate(headers, 1):
+            if header in column_widths:
+                ws.column_dimensions[get_column_letter(index)].width = column_widths[header]
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            header_row.append(cell)
+        ws.append(header_row)
+        return ws
+
+    def unique_sheet_title(self, sheet_name, used_titles):
+        """合法且在工作簿内不重复的工作表名（截断后可能重名时加序号）"""
+        title = self.safe_sheet_title(sheet_name)
+        base, suffix = title, 2
+        while title.lower() in used_titles or title == SHORTAGE_SHEET:
+            title = f"{base[:31 - len(str(suffix)) - 1]}_{suffix}"
+            suffix += 1
+        used_titles.add(title.lower())
+        return title
+
+    def safe_sheet_title(self, sheet_name):
+        """去掉 Excel 工作表名中不允许的字符，并截断到 31 个字符"""
+        title = re.sub(r"[\\/*?:\[\]]", "_", str(sheet_name))
+        return title[:31] or "Sheet"
+
+    def iter_excel_rows(self, data_rows):
+        """将行记录逐行排布为 Excel 的列：电话放到下一行的顾客姓名位置，空白单元格为 None"""
+        carried_phone = None
+        for record in data_rows:
+            row = [None] * len(EXCEL_HEADERS)
+            if carried_phone:
+                row[COLUMN["顾客姓名"]] = carried_phone  # 上一行的电话写入本行的顾客姓名列
+            carried_phone = None
+
+            if isinstance(record, OrderHeader):
+                row[COLUMN["销售"]] = record.salesperson or None
+                row[COLUMN["单号"]] = record.number or None
+                row[COLUMN["顾客姓名"]] = record.name or None
+                carried_phone = record.phone
+            elif isinstance(record, OrderItem):
+                row[COLUMN["产品型号"]] = record.vendor_plu or None
+                row[COLUMN["供货商"]] = record.vendor_name or None
+                row[COLUMN["数量"]] = record.qty
+                row[COLUMN["订货"]] = record.stock_status or None
+            yield row
@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+import threading
+
+STATE_FILENAME = "export_state.json"
+
+
+class ExportState:
+    """
+    记录每个输出文件已导出的订单（OriginalID → finished），用于增量追加。
+
+    同时在本地保留每个输出文件最近一次导出的工作簿副本，
+    增量模式在该副本上追加新订单后再发布，不需要从共享目录读回文件。
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.state_path = os.path.join(state_dir, STATE_FILENAME)
+        self.lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+
+    def load(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"无法读取导出记录: {e}")
+            return {}
+
+    def save(self, state):
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+
+    def workbook_copy_path(self, key):
+        """输出文件在本地保留的工作簿副本路径"""
+        return os.path.join(self.state_dir, key)
+
+    def changed_orders(self, key, signature, filtered_data):
+        """
+        返回相对上次导出新增的订单。
+
+        没有可用的导出记录（从未导出、生成条件不同或本地副本丢失）、
+        或已导出的订单 finished 已变化、不再符合筛选条件时返回 None，调用方应完整生成，
+        避免同一订单在工作表中出现两次或保留过期的订单。
+        """
+        with self.lock:
+            entry = self.load().get(key)
+        if entry is None or entry.get("signature") != signature:
+            return None
+        if not os.path.exists(self.workbook_copy_path(key)):
+            return None
+        exported = entry.get("orders", {})
+        current = {str(data["OriginalID"]): data.get("finished") for data in filtered_data}
+        for original_id, finished in exported.items():
+            if original_id not in current or current[original_id] != finished:
+                return None
+        return [data for data in filtered_data if str(data["OriginalID"]) not in exported]
+
+    def record(self, key, signature, exported_orders, workbook_path, append=False):
+        """
+        记录本次导出的订单并保存工作簿副本。
+
+        :param append: True 时与已有记录合并（增量追加），False 时覆盖
+        """
+        with self.lock:
+            state = self.load()
+            orders = state.get(key, {}).get("orders", {}) if append else {}
+            for data in exported_orders:
+                orders[str(data["OriginalID"])] = data.get("finished")
+            shutil.copyfile(workbook_path, self.workbook_copy_path(key))
+            state[key] = {"signature": signature, "orders": orders}
+            self.save(state)
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """令牌桶限速：每秒补充 rate 个令牌，最多累积 capacity 个"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有可用令牌时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ValidatorCache:
+    """
+    按 URL 记录响应的 ETag / Last-Modified 以及该响应的解析结果，最多保留 max_entries 个 URL。
+
+    再次请求同一 URL 时发送 If-None-Match / If-Modified-Since，
+    服务器返回 304 时调用方直接复用解析结果，不再解码和扫描页面。
+    """
+
+    def __init__(self, max_entries=100):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # URL → (ETag, Last-Modified, 解析结果)
+        self.lock = threading.Lock()
+
+    def request_headers(self, url):
+        """该 URL 的条件请求头，没有记录时返回空字典"""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def cached_result(self, url):
+        """上次记录的解析结果，没有记录时返回 None"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                return None
+            self.entries.move_to_end(url)
+            return entry[2]
+
+    def remember(self, url, response, result):
+        """记录响应的验证器和解析结果；响应没有验证器或解析结果为空时不记录"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        with self.lock:
+            if result is None or not (etag or last_modified):
+                self.entries.pop(url, None)
+                return
+            self.entries[url] = (etag, last_modified, result)
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class HttpSession(requests.Session):
+    """
+    销售系统使用的 requests 会话。
+
+    在普通 Session 的基础上增加：与并发线程数匹配的连接池、默认超时、
+    对 5xx 和超时 / 连接错误的指数退避重试、按主机的令牌桶限速，
+    以及按 URL 的条件请求（validators，见 ValidatorCache）。
+    keep-alive 和 gzip / deflate 压缩是 requests 的默认行为，无需另外设置。
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(self, timeout=20, retries=3, backoff=0.5, rate_per_second=10, burst=10, pool_size=10,
+                 conditional_cache_entries=100):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.validators = ValidatorCache(conditional_cache_entries) if conditional_cache_entries else None
+
+    def bucket_for(self, url):
+        """返回该主机的令牌桶，rate_per_second 为 0 时不限速"""
+        if not self.rate_per_second:
+            return None
+        host = urlsplit(url).netloc
+        with self.buckets_lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate_per_second, self.burst)
+            return self.buckets[host]
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        bucket = self.bucket_for(url)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                response = super().request(method, url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                response.close()
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
@@ -0,0 +1,221 @@
+"""
+录制与回放 HTTP 响应，用于离线、可重复的端到端性能测试。
+
+录制：RecordingAdapter 挂载到已登录的会话上，记录列表页和详情页的响应，
+保存前去除 cookie，页面只保留 var datalist / var data 语句并把其中的顾客个人信息（姓名、电话、邮箱等）
+替换为假名，写入一个 gzip 压缩的 JSON Lines 文件。
+回放：ReplayAdapter 挂载到任意 requests.Session 上，按 URL 的路径和查询参数返回录制的响应，
+支持 ETag 条件请求，并可注入固定延迟和随机抖动，不需要网络和浏览器登录。
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import scriptExtractor
+
+FIXTURE_FORMAT = 1
+# 只保留回放需要的响应头；Set-Cookie 等一律丢弃
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+# 需要替换为假名的字段（出现在 datalist 项或 var data 的任意层级）
+PII_KEYS = {
+    "FirstName", "LastName", "PhoneCell", "PhoneHome", "PhoneOffice", "Phone", "Email",
+    "Address", "Address1", "Address2", "City", "PostalCode", "Note", "Comment",
+}
+
+
+def fixture_key(url):
+    """回放时匹配响应用的键：路径和查询参数，忽略协议和主机"""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def pseudonym(value, prefix):
+    """同一个原值总是得到同一个假名，列表页和详情页中的同一顾客仍能对应"""
+    digest = hashlib.sha1(str(value).encode("utf-8")).hexdigest()
+    if prefix == "digits":
+        digits = "".join(str(int(char, 16) % 10) for char in digest)
+        return "555" + digits[:max(len(re.sub(r"\D", "", str(value))) - 3, 4)]
+    return f"{prefix}{digest[:8]}"
+
+
+def scrub_value(key, value):
+    if value in (None, ""):
+        return value
+    if "Phone" in key:
+        return pseudonym(value, "digits")
+    if key == "Email":
+        return f"{pseudonym(value, 'user')}@example.com"
+    return pseudonym(value, f"{key}-")
+
+
+def scrub_object(value):
+    """递归替换对象中的个人信息字段"""
+    if isinstance(value, dict):
+        return {
+            key: scrub_value(key, item) if key in PII_KEYS and not isinstance(item, (dict, list)) else scrub_object(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [scrub_object(item) for item in value]
+    return value
+
+
+def scrub_html(html_content):
+    """
+    只保留页面中的 var datalist / var data 语句，其中的个人信息字段逐个替换为假名，
+    OriginalID、Number 等其余字段保持不变；页面其余的 HTML 一律丢弃。
+    两个变量都找不到的页面保存为空页面。
+    """
+    statements = []
+    for name, pattern, opener in (("datalist", scriptExtractor.DATALIST_PATTERN, "["),
+                                  ("data", scriptExtractor.DATA_PATTERN, "{")):
+        match = pattern.search(html_content)
+        if not match or html_content[match.end():match.end() + 1] != opener:
+            continue
+        try:
+            value, _ = scriptExtractor.DECODER.raw_decode(html_content, match.end())
+        except ValueError:
+            continue
+        statements.append(f"var {name} = {json.dumps(scrub_object(value), ensure_ascii=False)};\n")
+    if not statements:
+        return ""
+    return "<html><body><script>\n" + "".join(statements) + "</script></body></html>"
+
+
+class FixtureArchive:
+    """录制的响应集合，以 fixture_key 为键"""
+
+    def __init__(self, entries=None, meta=None):
+        self.entries = entries or {}
+        self.meta = meta or {}
+        self.lock = threading.Lock()
+
+    def add(self, url, response):
+        """记录一个成功的响应（同一 URL 保留最后一次）；非 200 响应不记录"""
+        if response.status_code != 200:
+            return
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        entry = {"status": 200, "headers": headers, "body": scrub_html(response.text)}
+        with self.lock:
+            self.entries[fixture_key(url)] = entry
+
+    def get(self, url):
+        with self.lock:
+            return self.entries.get(fixture_key(url))
+
+    def save(self, path):
+        """写入 gzip 压缩的 JSON Lines：第一行为元数据，之后每行一个响应"""
+        meta = dict(self.meta, format=FIXTURE_FORMAT, recorded_at=datetime.now().isoformat(timespec="seconds"),
+                    count=len(self.entries))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock, gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            for key, entry in sorted(self.entries.items()):
+                f.write(json.dumps(dict(entry, key=key), ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            meta = json.loads(f.readline())
+            if meta.get("format") != FIXTURE_FORMAT:
+                raise ValueError(f"不支持的录制文件格式: {meta.get('format')}")
+            entries = {}
+            for line in f:
+                entry = json.loads(line)
+                entries[entry.pop("key")] = entry
+        return cls(entries, meta)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """正常发送请求，同时把响应记录到 FixtureArchive"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method == "GET":
+            # 读取响应内容后再记录；stream=False 时 Session 也会立即读取，不会多一次网络往返
+            self.archive.add(request.url, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    从 FixtureArchive 返回响应，不访问网络。
+
+    每个请求先等待 latency_ms 毫秒（加 0 到 jitter_ms 的随机抖动），模拟服务器延迟；
+    没有录制的 URL 返回 404。
+    """
+
+    def __init__(self, archive, latency_ms=0, jitter_ms=0, seed=1):
+        super().__init__()
+        self.archive = archive
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.request_count += 1
+            delay = self.latency_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        entry = self.archive.get(request.url)
+        if entry is None:
+            return self.build_response(request, 404, {}, b"")
+        headers = dict(entry["headers"])
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return self.build_response(request, 304, {"ETag": etag}, b"")
+        return self.build_response(request, entry["status"], headers, entry["body"].encode("utf-8"))
+
+    def build_response(self, request, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}.get(status, "")
+        response.headers = CaseInsensitiveDict(headers)
+        response.headers["Content-Length"] = str(len(body))
+        response._content = body
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+def start_recording(session, meta=None):
+    """在会话上挂载录制适配器，返回用于保存的 FixtureArchive"""
+    archive = FixtureArchive(meta=meta)
+    pool_size = getattr(session.get_adapter("http://"), "_pool_maxsize", 10)
+    adapter = RecordingAdapter(archive, pool_connections=4, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return archive
+
+
+def start_replay(session, archive_path, latency_ms=0, jitter_ms=0):
+    """在会话上挂载回放适配器，之后该会话的所有请求都由录制文件应答"""
+    adapter = ReplayAdapter(FixtureArchive.load(archive_path), latency_ms, jitter_ms)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
@@ -1,42 +1,70 @@
+import time
+STARTUP_STARTED_AT = time.perf_counter()  # 用于统计启动到窗口显示的耗时
+
 import sys
+import threading
+import importlib
+import multiprocessing
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
-    QComboBox, QRadioButton, QDateEdit, QMessageBox, QButtonGroup
+    QComboBox, QRadioButton, QDateEdit, QMessageBox, QButtonGroup, QDialog, QPlainTextEdit
 )
-from PyQt5.QtCore import QDate
+from PyQt5.QtCore import QDate, QTimer
 from PyQt5.QtGui import QFont, QIcon
-from openpyxl import Workbook
-import pandas as pd
-from dataProcessor import DataProcessor
+from dataProcessor import DataProcessor, http_options_from_config
+from excelWriter import ExcelWriter
+from appConfig import COOKIE_FILENAME, DEFAULT_OUTPUT_DIR, load_config, open_detail_cache, open_order_store
+from publisher import Publisher
+from exportState import ExportState
+from workers import LoginWorker, GenerateWorker
+from autoSync import read_status, status_age_seconds, status_path_from_config
 import os
-import json
 import re
+from datetime import datetime, timedelta
 
 # 全局常量
-CONFIG_FILENAME = "config.json"
 ICON_FILENAME = "app_icon.png"
 APP_NAME = "VIVA自提单自动生成工具 V2.2.0"
 APP_TITLE = f"{APP_NAME} - Designed by Harry & Zeror"
+# 窗口显示后在后台预加载的重型依赖
+HEAVY_MODULES = ["requests", "httpClient", "openpyxl", "selenium.webdriver"]
 
 
 class DataExtractorApp(QWidget):
     def __init__(self):
         super().__init__()
-        self.config = self.load_config()  # 加载配置文件
+        self.config = load_config()  # 加载配置文件
         self.dynamic_output_name = self.config.get("dynamic_output_name", 0)
-        self.processor = DataProcessor()  # 实例化数据处理类
+        self.fetch_workers = self.config.get("fetch_workers", 1)  # 并发请求详情页的线程数
+        self.prefetch_pages = self.config.get("prefetch_pages", 2)  # 列表页预取页数
+        self.max_pages = self.config.get("max_pages", 50)  # 列表页最多翻页数
+        self.output_dir = self.config.get("output_dir", DEFAULT_OUTPUT_DIR)  # 输出目录
+        self.processor = DataProcessor(
+            snapshot_max_age=self.config.get("datalist_snapshot_seconds", 300),
+            http_options=http_options_from_config(self.config),
+            parse_processes=self.config.get("parse_processes", 0),
+            parse_process_min_bytes=self.config.get("parse_process_min_kb", 64) * 1024
+        )  # 实例化数据处理类
+        self.writer = ExcelWriter()  # Excel 写入
+        self.export_state = ExportState(os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), self.config.get("export_state_dir", "export_state")
+        ))  # 已导出订单记录，用于增量追加
+        self.publisher = Publisher(self.output_dir, self.config.get("staging_dir") or None)  # 本地生成后发布到共享目录
         self.session = None  # 全局 requests.Session 对象，用于复用 cookie
-        self.init_ui()
-
-    def load_config(self):
-        """加载配置文件"""
+        self.login_worker = None  # 后台登录线程
+        self.generate_worker = None  # 后台生成线程
+        self.orders_progress_text = ""  # 最近一次订单获取进度，写入进度附在其后显示
+        self.report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       self.config.get("report_dir", "run_reports"))  # 运行报告目录
+        self.last_report_path = None  # 最近一次运行报告
+        self.cookie_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        self.config.get("cookie_file", COOKIE_FILENAME))  # 本地保存的登录 cookie
         base_path = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(base_path, CONFIG_FILENAME)
-        if os.path.exists(config_path):
-            with open(config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        else:
-            raise FileNotFoundError(f"配置文件未找到: {config_path}")
+        self.order_store = open_order_store(self.config, base_path)  # 本地订单库，启用时代替详情缓存
+        self.detail_cache = None if self.order_store else open_detail_cache(self.config, base_path)  # 订单详情本地缓存
+        self.auto_sync_status_path = status_path_from_config(self.config)  # 后台自动同步服务的状态文件
+        self.init_ui()
+        self.try_saved_login()
 
     def init_ui(self):
         """初始化用户界面"""
@@ -74,19 +102,32 @@ class DataExtractorApp(QWidget):
         self.mode_group.addButton(self.number_mode_button)
         self.date_mode_button.setChecked(True)
 
+        # 按销售查询只能在本地订单库中进行
+        self.salesperson_mode_button = QRadioButton("按销售生成（本地订单库）")
+        self.mode_group.addButton(self.salesperson_mode_button)
+
         layout.addWidget(QLabel("选择生成模式:"))
         layout.addWidget(self.date_mode_button)
         layout.addWidget(self.number_mode_button)
+        layout.addWidget(self.salesperson_mode_button)
 
         self.date_mode_button.toggled.connect(self.update_mode)
         self.number_mode_button.toggled.connect(self.update_mode)
+        self.salesperson_mode_button.toggled.connect(self.update_mode)
 
         # 日期输入
         self.target_date_input = QDateEdit()
         self.target_date_input.setCalendarPopup(True)
         self.target_date_input.setDate(QDate.currentDate())
+
+        # 按日期生成时的结束日期（含），默认与起始日期相同；起始日期改变时重置为单日
+        self.end_date_input = QDateEdit()
+        self.end_date_input.setCalendarPopup(True)
+        self.end_date_input.setDate(QDate.currentDate())
+        self.target_date_input.dateChanged.connect(self.end_date_input.setDate)
         if self.dynamic_output_name:
             self.target_date_input.dateChanged.connect(self.update_output_filename)
+            self.end_date_input.dateChanged.connect(self.update_output_filename)
 
         # 单号输入
         self.target_number_input = QLineEdit()
@@ -94,10 +135,31 @@ class DataExtractorApp(QWidget):
         if self.dynamic_output_name:
             self.target_number_input.textChanged.connect(self.update_output_filename)
 
-        layout.addWidget(QLabel("目标日期或单号:"))
+        # 按销售生成：销售和开始日期（结束日期使用上面的日期输入）
+        self.salesperson_input = QComboBox()
+        self.salesperson_input.setEditable(True)
+        self.salesperson_input.setVisible(False)
+        self.start_date_input = QDateEdit()
+        self.start_date_input.setCalendarPopup(True)
+        self.start_date_input.setDate(QDate.currentDate().addDays(1 - QDate.currentDate().day()))
+        self.start_date_input.setVisible(False)
+        if self.dynamic_output_name:
+            self.salesperson_input.currentTextChanged.connect(self.update_output_filename)
+            self.start_date_input.dateChanged.connect(self.update_output_filename)
+
+        layout.addWidget(QLabel("目标日期或单号（按日期时为起止日期，多个单号用空格或逗号分隔；按销售时为销售和起止日期）:"))
+        layout.addWidget(self.salesperson_input)
+        layout.addWidget(self.start_date_input)
         layout.addWidget(self.target_date_input)
+        layout.addWidget(self.end_date_input)
         layout.addWidget(self.target_number_input)
 
+        # 多个目标写入同一个工作簿时的工作表划分
+        self.sheet_grouping_input = QComboBox()
+        self.sheet_grouping_input.addItems(["每个日期 / 单号一个工作表", "每个销售一个工作表"])
+        layout.addWidget(QLabel("工作表划分:"))
+        layout.addWidget(self.sheet_grouping_input)
+
         # 输出文件名
         self.output_filename_input = QLineEdit()
         layout.addWidget(QLabel("输出文件名:"))
@@ -111,7 +173,7 @@ class DataExtractorApp(QWidget):
         # 选项设置
         self.include_stock_status_input = QComboBox()
         self.include_stock_status_input.addItems(["否", "是"])
-        layout.addWidget(QLabel("是否生成订货列:"))
+        layout.addWidget(QLabel("是否生成订货列（含缺货汇总表）:"))
         layout.addWidget(self.include_stock_status_input)
 
         self.finished_filter_input = QComboBox()
@@ -124,11 +186,52 @@ class DataExtractorApp(QWidget):
         layout.addWidget(QLabel("跳过负库存记录:"))
         layout.addWidget(self.skip_negative_qty_input)
 
+        self.incremental_input = QComboBox()
+        self.incremental_input.addItems(["否", "是"])
+        layout.addWidget(QLabel("仅追加上次导出后的新订单:"))
+        layout.addWidget(self.incremental_input)
+
+        self.refresh_details_input = QComboBox()
+        self.refresh_details_input.addItems(["否", "是"])
+        layout.addWidget(QLabel("重新获取订单详情（忽略缓存，订单修改后使用）:"))
+        layout.addWidget(self.refresh_details_input)
+
+        # 列表数据快照状态与刷新按钮
+        self.snapshot_label = QLabel("列表数据: 未获取")
+        layout.addWidget(self.snapshot_label)
+        self.refresh_button = QPushButton("刷新列表数据")
+        self.refresh_button.clicked.connect(self.on_refresh_click)
+        layout.addWidget(self.refresh_button)
+
+        # 后台自动同步服务状态
+        self.auto_sync_label = QLabel("后台同步: 未运行")
+        layout.addWidget(self.auto_sync_label)
+        self.auto_sync_timer = QTimer(self)
+        self.auto_sync_timer.timeout.connect(self.update_auto_sync_label)
+        self.auto_sync_timer.start(30 * 1000)
+        self.update_auto_sync_label()
+
         # 生成按钮
         self.generate_button = QPushButton("生成")
         self.generate_button.clicked.connect(self.on_generate_click)
         layout.addWidget(self.generate_button)
 
+        # 取消按钮（仅在生成过程中可用）
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.on_cancel_click)
+        layout.addWidget(self.cancel_button)
+
+        # 进度文本
+        self.progress_label = QLabel("")
+        layout.addWidget(self.progress_label)
+
+        # 运行报告（各阶段耗时、请求延迟，可选 cProfile）
+        self.report_button = QPushButton("查看运行报告")
+        self.report_button.setEnabled(False)
+        self.report_button.clicked.connect(self.on_report_click)
+        layout.addWidget(self.report_button)
+
         # 设置默认输出文件名
         if self.dynamic_output_name:
             self.update_output_filename()
@@ -141,8 +244,12 @@ class DataExtractorApp(QWidget):
         self.setLayout(layout)
 
     def update_mode(self):
-        """根据模式切换显示目标日期或单号输入框"""
-        if self.date_mode_button.isChecked():
+        """根据模式切换显示目标日期、单号或销售输入框"""
+        salesperson_mode = self.salesperson_mode_button.isChecked()
+        self.salesperson_input.setVisible(salesperson_mode)
+        self.start_date_input.setVisible(salesperson_mode)
+        self.end_date_input.setVisible(self.date_mode_button.isChecked())
+        if self.date_mode_button.isChecked() or salesperson_mode:
             # 显示日期输入框，隐藏单号输入框
             self.target_date_input.setVisible(True)
             self.target_number_input.setVisible(False)
@@ -150,6 +257,8 @@ class DataExtractorApp(QWidget):
             # 显示单号输入框，隐藏日期输入框
             self.target_date_input.setVisible(False)
             self.target_number_input.setVisible(True)
+        if salesperson_mode:
+            self.update_salesperson_list()
 
         # 更新输出文件名
         if self.dynamic_output_name:
@@ -160,11 +269,43 @@ class DataExtractorApp(QWidget):
         if self.date_mode_button.isChecked():
             # 按日期生成
             selected_date = self.target_date_input.date().toString("yyyy-MM-dd")
+            end_date = self.end_date_input.date().toString("yyyy-MM-dd")
+            if end_date > selected_date:
+                selected_date = f"{selected_date}_{end_date}"
             self.output_filename_input.setText(f"Viva自提单生成H_{selected_date}")
         elif self.number_mode_button.isChecked():
-            # 按单号生成
-            entered_number = self.target_number_input.text()
+            # 按单号生成，多个单号时使用第一个和最后一个
+            numbers = self.parse_order_numbers()
+            entered_number = "_".join([numbers[0], numbers[-1]]) if len(numbers) > 1 else self.target_number_input.text()
             self.output_filename_input.setText(f"Viva自提单生成H_{entered_number}")
+        elif self.salesperson_mode_button.isChecked():
+            # 按销售生成
+            salesperson = self.salesperson_input.currentText()
+            start_date = self.start_date_input.date().toString("yyyy-MM-dd")
+            end_date = self.target_date_input.date().toString("yyyy-MM-dd")
+            self.output_filename_input.setText(f"Viva自提单生成H_{salesperson}_{start_date}_{end_date}")
+
+    def parse_order_numbers(self):
+        """单号输入框中的一个或多个单号（空格、逗号分隔），去重并保持顺序"""
+        numbers = re.split(r"[\s,，]+", self.target_number_input.text().strip())
+        return list(dict.fromkeys(number for number in numbers if number))
+
+    def date_range_targets(self):
+        """起止日期之间（含）的每一天"""
+        start_date = self.target_date_input.date().toPyDate()
+        end_date = max(self.end_date_input.date().toPyDate(), start_date)
+        return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+    def update_salesperson_list(self):
+        """用本地订单库中出现过的销售填充下拉列表，保留当前输入"""
+        if self.order_store is None:
+            return
+        current = self.salesperson_input.currentText()
+        self.salesperson_input.blockSignals(True)
+        self.salesperson_input.clear()
+        self.salesperson_input.addItems(self.order_store.salespeople())
+        self.salesperson_input.setEditText(current)
+        self.salesperson_input.blockSignals(False)
 
 
 
@@ -172,13 +313,21 @@ class DataExtractorApp(QWidget):
         """启用或禁用所有控件（除了登录页面 URL 和登录按钮）"""
         self.date_mode_button.setEnabled(enable)
         self.number_mode_button.setEnabled(enable)
+        self.salesperson_mode_button.setEnabled(enable and self.order_store is not None)
+        self.salesperson_input.setEnabled(enable)
+        self.start_date_input.setEnabled(enable)
         self.target_date_input.setEnabled(enable)
+        self.end_date_input.setEnabled(enable)
         self.target_number_input.setEnabled(enable)
+        self.sheet_grouping_input.setEnabled(enable)
         self.output_filename_input.setEnabled(enable)
         self.url1_input.setEnabled(enable)
         self.include_stock_status_input.setEnabled(enable)
         self.finished_filter_input.setEnabled(enable)
         self.skip_negative_qty_input.setEnabled(enable)
+        self.incremental_input.setEnabled(enable)
+        self.refresh_details_input.setEnabled(enable)
+        self.refresh_button.setEnabled(enable)
         self.generate_button.setEnabled(enable)
 
     def update_input_fields(self):
@@ -191,177 +340,322 @@ class DataExtractorApp(QWidget):
             self.target_number_input.setVisible(True)
 
     def on_login_click(self):
-        """点击登录按钮的处理逻辑"""
-        try:
-            login_url = self.login_url_input.text()
-            if not login_url:
-                QMessageBox.warning(self, "警告", "登录页面 URL 不能为空！")
-                return
-
-            # 设置登录按钮状态为“登录中，请稍后”
-            self.login_button.setText("登录中，请稍后")
-            self.login_button.setEnabled(False)  # 禁用按钮以防重复点击
-            QApplication.processEvents()  # 刷新界面
-
-            # 执行登录操作
-            self.session = self.processor.get_authenticated_session(login_url)
-
-            # 登录成功后尝试加载默认单号
-            default_order_number = self.fetch_default_order_number()
-            if default_order_number == "解析错误" or not default_order_number:
-                raise ValueError("默认单号解析失败，登录未完成。")
-
-            # 默认单号解析成功
-            self.target_number_input.setText(default_order_number)
-            self.login_button.setText("登录成功")
-            self.login_button.setEnabled(False)
-            self.login_status_label.setVisible(True)
-
-            # 启用其他控件
-            self.toggle_controls(True)
-
-            QMessageBox.information(self, "提示", f"登录成功！默认单号: {default_order_number}")
-
-        except Exception as e:
-            # 登录失败时恢复按钮状态
-            self.login_button.setText("登录")
-            self.login_button.setEnabled(True)
-            self.toggle_controls(False)  # 确保控件仍然禁用
-            QMessageBox.critical(self, "错误", f"登录失败: {str(e)}")
-
-    def fetch_default_order_number(self):
-        """从 URL1 的 datalist 提取第一个字典的 Number 值"""
-        url1 = self.config.get("url1", "")
-        if not url1:
-            return "URL错误"
-
-        try:
-            response = self.session.get(url1)  # 使用已登录的 session
-            response.raise_for_status()
-
-            # 尝试解析 datalist 数据
-            match = re.search(r"var\s+datalist\s*=\s*(\[.*?\]);", response.text, re.DOTALL)
-            if match:
-                datalist = json.loads(match.group(1))
-                if datalist and isinstance(datalist, list):
-                    first_item = datalist[0]
-                    if "Number" in first_item:
-                        return first_item["Number"]
-        except Exception as e:
-            print(f"无法获取默认单号: {e}")
-
-        # 解析失败，打印 HTML 源代码的第 100-150 行
-        try:
-            lines = response.text.splitlines()  # 分割 HTML 为按行的列表
-            snippet = "\n".join(lines[99:150])  # 提取第 100-150 行
-            print("网页源代码 (第 100-150 行):")
-            print(snippet)
-        except Exception as inner_e:
-            print(f"无法打印网页源代码: {inner_e}")
+        """点击登录按钮的处理逻辑，浏览器登录和默认单号解析在后台线程中进行"""
+        login_url = self.login_url_input.text()
+        if not login_url:
+            QMessageBox.warning(self, "警告", "登录页面 URL 不能为空！")
+            return
+
+        # 设置登录按钮状态为“登录中，请稍后”
+        self.login_button.setText("登录中，请稍后")
+        self.login_button.setEnabled(False)  # 禁用按钮以防重复点击
+
+        self.start_login_worker(login_url, allow_browser=True)
+
+    def try_saved_login(self):
+        """启动时尝试使用已保存的 cookie 自动登录，失败时不启动浏览器"""
+        if not os.path.exists(self.cookie_path):
+            return
+        self.login_button.setText("正在恢复登录，请稍后")
+        self.login_button.setEnabled(False)
+        self.start_login_worker(self.login_url_input.text(), allow_browser=False)
+
+    def start_login_worker(self, login_url, allow_browser):
+        """创建并启动后台登录线程"""
+        self.login_worker = LoginWorker(self.processor, login_url, self.config.get("url1", ""),
+                                        cookie_path=self.cookie_path, allow_browser=allow_browser,
+                                        report_dir=self.report_dir, parent=self)
+        self.login_worker.report_ready.connect(self.on_report_ready)
+        self.login_worker.browser_ready.connect(self.on_login_browser_ready)
+        self.login_worker.succeeded.connect(self.on_login_succeeded)
+        self.login_worker.saved_session_invalid.connect(self.on_saved_session_invalid)
+        self.login_worker.failed.connect(self.on_login_failed)
+        self.login_worker.start()
+
+    def on_saved_session_invalid(self):
+        """已保存的 cookie 已失效，恢复登录按钮等待手动登录"""
+        self.login_button.setText("登录")
+        self.login_button.setEnabled(True)
+
+    def on_login_browser_ready(self):
+        """浏览器已打开，提示用户完成登录后通知后台线程继续"""
+        QMessageBox.information(self, "提示", "请在浏览器中完成登录后点击确定继续。")
+        self.login_worker.confirm_login()
+
+    def on_login_succeeded(self, session, default_order_number):
+        """登录成功并解析到默认单号"""
+        self.session = session
+        self.target_number_input.setText(default_order_number)
+        self.login_button.setText("登录成功")
+        self.login_button.setEnabled(False)
+        self.login_status_label.setVisible(True)
+
+        # 启用其他控件
+        self.toggle_controls(True)
+        self.update_snapshot_label()
+
+        QMessageBox.information(self, "提示", f"登录成功！默认单号: {default_order_number}")
+
+    def update_snapshot_label(self):
+        """显示当前列表数据快照的获取时间"""
+        fetched_at = self.processor.snapshot_time()
+        if fetched_at is None:
+            self.snapshot_label.setText("列表数据: 生成时实时获取")
+        else:
+            self.snapshot_label.setText(f"列表数据: {datetime.fromtimestamp(fetched_at):%H:%M:%S} 获取")
 
-        return "解析错误"
+    def on_refresh_click(self):
+        """丢弃列表数据快照，下次生成时重新请求列表页"""
+        self.processor.clear_datalist_snapshot()
+        self.update_snapshot_label()
 
+    def on_login_failed(self, message):
+        """登录失败时恢复按钮状态"""
+        self.login_button.setText("登录")
+        self.login_button.setEnabled(True)
+        self.toggle_controls(False)  # 确保控件仍然禁用
+        QMessageBox.critical(self, "错误", f"登录失败: {message}")
 
     def on_generate_click(self):
-        """点击生成按钮的处理逻辑"""
-        try:
-            # 禁用生成按钮并修改按钮文本
-            self.generate_button.setText("正在生成，请稍后")
-            self.generate_button.setEnabled(False)  # 禁用按钮
-            QApplication.processEvents()  # 刷新界面
-
-            if not self.session:
-                QMessageBox.warning(self, "警告", "请先登录！")
-                self.generate_button.setText("生成")
-                self.generate_button.setEnabled(True)  # 恢复按钮
-                return
+        """点击生成按钮的处理逻辑，在后台线程中执行生成流程"""
+        if not self.session:
+            QMessageBox.warning(self, "警告", "请先登录！")
+            return
 
-            login_url = self.login_url_input.text()
-            url1 = self.url1_input.text()
-            base_url = self.config.get("base_url", "")
-            include_stock_status = self.include_stock_status_input.currentText() == "是"
-            finished_filter = self.finished_filter_input.currentIndex() - 1
-            skip_negative_qty = self.skip_negative_qty_input.currentText() == "是"
-            output_filename = self.output_filename_input.text().strip()
-
-            if not output_filename:
-                QMessageBox.warning(self, "警告", "输出文件名不能为空！")
-                self.generate_button.setText("生成")
-                self.generate_button.setEnabled(True)  # 恢复按钮
-                return
+        output_filename = self.output_filename_input.text().strip()
+        if not output_filename:
+            QMessageBox.warning(self, "警告", "输出文件名不能为空！")
+            return
 
-            if self.date_mode_button.isChecked():
-                target = self.target_date_input.date().toPyDate()
-                mode = "date"
-            else:
-                target = self.target_number_input.text()
-                mode = "orderNumber"
-
-            # 使用 DataProcessor 处理数据
-            response = self.session.get(url1)
-            datalist = self.processor.extract_datalist(response.text)
-            filtered_data = self.processor.filter_data(datalist, target, mode, finished_filter)
-            data_rows = self.processor.fetch_and_format_data(filtered_data, self.session, base_url, include_stock_status, skip_negative_qty)
-
-            # 检查是否有内容可写入 Excel
-            if not data_rows:
-                QMessageBox.warning(self, "提示", "解析到的内容为空，未生成文件。")
-                self.generate_button.setText("生成")
-                self.generate_button.setEnabled(True)  # 恢复按钮
+        if self.date_mode_button.isChecked():
+            targets = self.date_range_targets()
+            mode = "date"
+        elif self.salesperson_mode_button.isChecked():
+            salesperson = self.salesperson_input.currentText().strip()
+            if not salesperson:
+                QMessageBox.warning(self, "警告", "请输入销售！")
                 return
+            targets = [(salesperson, self.start_date_input.date().toPyDate(), self.target_date_input.date().toPyDate())]
+            mode = "salesperson"
+        else:
+            targets = self.parse_order_numbers() or [self.target_number_input.text()]
+            mode = "orderNumber"
+
+        sheet_grouping = "salesperson" if self.sheet_grouping_input.currentIndex() == 1 else "target"
+        incremental = self.incremental_input.currentText() == "是"
+        refresh_details = self.refresh_details_input.currentText() == "是"
+        single_sheet = len(targets) == 1 and sheet_grouping == "target"
+        if incremental and not single_sheet:
+            QMessageBox.warning(self, "警告", "增量追加只支持单个日期或单号、且不按销售划分工作表！")
+            return
+
+        if mode == "date" and single_sheet and not incremental and not refresh_details \
+                and self.use_auto_sync_result(targets[0], f"{output_filename}.xlsx"):
+            return
+
+        params = {
+            "url1": self.url1_input.text(),
+            "base_url": self.config.get("base_url", ""),
+            "target": targets[0],
+            "targets": targets,
+            "sheet_grouping": sheet_grouping,
+            "mode": mode,
+            "include_stock_status": self.include_stock_status_input.currentText() == "是",
+            "finished_filter": self.finished_filter_input.currentIndex() - 1,
+            "skip_negative_qty": self.skip_negative_qty_input.currentText() == "是",
+            "fetch_workers": self.fetch_workers,
+            "prefetch_pages": self.prefetch_pages,
+            "max_pages": self.max_pages,
+            "detail_cache": self.order_store or self.detail_cache,
+            "order_store": self.order_store,
+            "incremental": incremental,
+            "refresh_details": refresh_details,
+            "export_state": self.export_state,
+            "profile": bool(self.config.get("profile_runs", 0)),
+            "report_dir": self.report_dir,
+            "output_filename": f"{output_filename}.xlsx",
+        }
+
+        # 禁用生成按钮并修改按钮文本
+        self.generate_button.setText("正在生成，请稍后")
+        self.generate_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_label.setText("")
+        self.orders_progress_text = ""
+
+        self.generate_worker = GenerateWorker(self.processor, self.writer, self.publisher, self.session, params, self)
+        self.generate_worker.progress.connect(self.on_generate_progress)
+        self.generate_worker.succeeded.connect(self.on_generate_succeeded)
+        self.generate_worker.queued.connect(self.on_generate_queued)
+        self.generate_worker.empty.connect(self.on_generate_empty)
+        self.generate_worker.no_new_orders.connect(self.on_generate_no_new_orders)
+        self.generate_worker.cancelled.connect(self.on_generate_cancelled)
+        self.generate_worker.failed.connect(self.on_generate_failed)
+        self.generate_worker.failures_found.connect(self.on_generate_failures)
+        self.generate_worker.report_ready.connect(self.on_report_ready)
+        self.generate_worker.finished.connect(self.on_generate_finished)
+        self.generate_worker.start()
+
+    def fresh_auto_sync_status(self):
+        """返回最近一次同步未超过两个周期的后台服务状态，否则返回 None"""
+        status = read_status(self.auto_sync_status_path)
+        age = status_age_seconds(status)
+        if age is None or age > 2 * status.get("interval_seconds", 300):
+            return None
+        return status
+
+    def update_auto_sync_label(self):
+        """显示后台自动同步服务的状态"""
+        status = read_status(self.auto_sync_status_path)
+        if status is None or status.get("state") == "stopped":
+            self.auto_sync_label.setText("后台同步: 未运行")
+        elif self.fresh_auto_sync_status() is None:
+            self.auto_sync_label.setText(f"后台同步: {status.get('message', '')}（已过期）")
+        else:
+            synced_at = status["synced_at"].replace("T", " ")
+            self.auto_sync_label.setText(
+                f"后台同步: {synced_at} {status.get('message', '')}，当天 {status.get('order_count', 0)} 个订单"
+            )
 
-            # 保存到 Excel
-            output_filepath = f"//VIVA303-WORK/Viva店面共享/{output_filename}.xlsx"
-            self.write_to_excel(data_rows, output_filepath)
-            QMessageBox.information(self, "完成", f"数据处理完成，文件已保存为：{output_filepath}")
-
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"发生错误: {str(e)}")
-
-        finally:
-            # 恢复生成按钮状态
-            self.generate_button.setText("生成")
-            self.generate_button.setEnabled(True)
-
-
-
-    def write_to_excel(self, data_rows, filename):
-        """保存数据到 Excel 文件"""
-        headers = ["空A", "销售", "单号", "空D", "产品型号", "供货商", "数量", "顾客姓名", "电话", "家具自提", "留言", "货期", "订货"]
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "数据提取"
-
-        ws.append(headers)
-        for row in data_rows:
-            ws.append(row)
-        wb.save(filename)
-
-        self.process_excel(filename)
-
-    def process_excel(self, file_path):
+    def use_auto_sync_result(self, target, output_filename):
         """
-        处理 Excel 文件，将 "电话" 列的值向左下一格移动，并删除 "电话" 列。
-        处理完成后直接覆盖原文件。
-
-        :param file_path: str, 输入的 Excel 文件路径
+        后台服务已按相同条件生成了目标日期的文件时，询问是否直接使用；
+        使用则返回 True，不再启动生成流程。
         """
-
-        # 读取 Excel 文件
-        df = pd.read_excel(file_path)
-
-        # 遍历 "电话" 列的值并将其向左下一格移动
-        for index in range(len(df) - 1):  # 遍历到倒数第二行
-            if pd.notna(df.loc[index, '电话']):  # 如果当前行的 "电话" 列有值
-                df.loc[index + 1, '顾客姓名'] = df.loc[index, '电话']  # 向下一行 "顾客姓名" 列移动值
-
-        # 删除 "电话" 列
-        df.drop(columns=['电话'], inplace=True)
-
-        # 保存结果覆盖原文件
-        df.to_excel(file_path, index=False)
-        print(f'文件已处理并覆盖保存为 {file_path}')
-
+        status = self.fresh_auto_sync_status()
+        options = {
+            "include_stock_status": self.include_stock_status_input.currentText() == "是",
+            "finished_filter": self.finished_filter_input.currentIndex() - 1,
+            "skip_negative_qty": self.skip_negative_qty_input.currentText() == "是",
+        }
+        if status is None or status.get("target") != str(target) or status.get("filename") != output_filename \
+                or status.get("options") != options or status.get("failed_orders"):
+            return False
+
+        synced_at = status["synced_at"].replace("T", " ")
+        reply = QMessageBox.question(
+            self, "提示",
+            f"后台服务已在 {synced_at} 生成该文件（{status['order_count']} 个订单）。\n"
+            f"是否直接使用？选择“否”将重新生成。",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            return False
+        if status.get("published"):
+            self.on_generate_succeeded(status["output_path"])
+        else:
+            self.on_generate_queued(status["output_path"], status.get("local_path") or "")
+        return True
+
+    def on_cancel_click(self):
+        """请求取消正在进行的生成"""
+        if self.generate_worker is not None:
+            self.generate_worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.progress_label.setText("正在取消...")
+
+    def on_generate_progress(self, stage, done, total):
+        """显示生成进度"""
+        if stage == "pages":
+            self.progress_label.setText(f"已获取列表页: {done}")
+        elif stage == "orders":
+            self.orders_progress_text = f"已获取订单: {done}/{total}"
+            self.progress_label.setText(self.orders_progress_text)
+        elif stage == "rows":
+            # 详情获取与写入流式交替进行，写入进度附在订单进度之后显示
+            rows_text = f"已写入行: {done}/{total}" if total else f"已写入行: {done}"
+            self.progress_label.setText(f"{self.orders_progress_text}，{rows_text}"
+                                        if self.orders_progress_text else rows_text)
+
+    def on_report_ready(self, report_path):
+        """记录最近一次运行报告"""
+        self.last_report_path = report_path
+        self.report_button.setEnabled(True)
+
+    def on_report_click(self):
+        """在对话框中显示最近一次运行报告"""
+        if not self.last_report_path:
+            return
+        try:
+            with open(self.last_report_path, "r", encoding="utf-8") as f:
+                report = f.read()
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"无法读取运行报告: {e}")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"运行报告 - {os.path.basename(self.last_report_path)}")
+        dialog.resize(self.width() * 2, self.height())
+        dialog_layout = QVBoxLayout(dialog)
+        report_view = QPlainTextEdit(report)
+        report_view.setReadOnly(True)
+        report_view.setFont(QFont("Consolas", 10))
+        dialog_layout.addWidget(report_view)
+        dialog.exec_()
+
+    def on_generate_succeeded(self, output_filepath):
+        QMessageBox.information(self, "完成", f"数据处理完成，文件已保存为：{output_filepath}")
+
+    def on_generate_queued(self, dest_path, local_path):
+        QMessageBox.warning(
+            self, "提示",
+            f"共享目录暂不可用，文件已保存在本地：{local_path}\n下次生成时会自动重试发布到：{dest_path}"
+        )
+
+    def on_generate_failures(self, failures):
+        """汇总显示重试后仍获取失败、未写入表格的订单"""
+        lines = [f"{failure['Number']} ({failure['UserName']}): {failure['error']}" for failure in failures[:20]]
+        if len(failures) > 20:
+            lines.append(f"... 共 {len(failures)} 个订单")
+        QMessageBox.warning(self, "部分订单获取失败", "以下订单未写入表格：\n" + "\n".join(lines))
+
+    def on_generate_empty(self):
+        QMessageBox.warning(self, "提示", "解析到的内容为空，未生成文件。")
+
+    def on_generate_no_new_orders(self):
+        QMessageBox.information(self, "提示", "上次导出后没有新增或变化的订单，文件未改动。")
+
+    def on_generate_cancelled(self):
+        self.progress_label.setText("已取消")
+
+    def on_generate_failed(self, message):
+        QMessageBox.critical(self, "错误", f"发生错误: {message}")
+
+    def on_generate_finished(self):
+        """恢复生成按钮状态"""
+        self.generate_button.setText("生成")
+        self.generate_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.generate_worker = None
+        self.update_snapshot_label()
+
+    def closeEvent(self, event):
+        """关闭窗口前停止后台线程，避免 QThread 在运行中被销毁"""
+        self.auto_sync_timer.stop()
+        if self.login_worker is not None and self.login_worker.isRunning():
+            self.login_worker.cancel()
+            self.login_worker.wait()
+        if self.generate_worker is not None and self.generate_worker.isRunning():
+            self.generate_worker.cancel()
+            self.generate_worker.wait()
+        super().closeEvent(event)
+
+    def preload_heavy_modules(self):
+        """窗口显示后在后台线程中预加载重型依赖，首次生成时无需再等待导入"""
+        def preload():
+            for module_name in HEAVY_MODULES:
+                try:
+                    importlib.import_module(module_name)
+                except ImportError as e:
+                    print(f"预加载 {module_name} 失败: {e}")
+
+        threading.Thread(target=preload, daemon=True).start()
+
+    def report_startup_time(self):
+        """打印从进程启动到窗口显示的耗时，以及此时已加载的重型依赖"""
+        elapsed_ms = (time.perf_counter() - STARTUP_STARTED_AT) * 1000
+        loaded = [name for name in HEAVY_MODULES + ["pandas"] if name in sys.modules]
+        print(f"启动耗时: {elapsed_ms:.0f} ms，窗口显示时已加载的重型依赖: {', '.join(loaded) or '无'}")
 
     def get_icon_path(self):
         """获取图标路径"""
@@ -370,7 +664,13 @@ class DataExtractorApp(QWidget):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为 exe 后解析进程池需要
     app = QApplication(sys.argv)
     extractor_app = DataExtractorApp()
     extractor_app.show()
-    sys.exit(app.exec_())
+    # 事件循环开始后（窗口已绘制）再统计启动耗时并预加载依赖
+    QTimer.singleShot(0, extractor_app.report_startup_time)
+    QTimer.singleShot(0, extractor_app.preload_heavy_modules)
+    exit_code = app.exec_()
+    extractor_app.processor.shutdown()
+    sys.exit(exit_code)
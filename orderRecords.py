@@ -0,0 +1,49 @@
+class OrderHeader:
+    """订单的第一行：销售、单号、顾客姓名和合并后的电话"""
+    __slots__ = ("salesperson", "number", "name", "phone")
+
+    def __init__(self, salesperson, number, name, phone):
+        self.salesperson = salesperson
+        self.number = number
+        self.name = name
+        self.phone = phone
+
+    def __repr__(self):
+        return f"OrderHeader({self.salesperson!r}, {self.number!r}, {self.name!r}, {self.phone!r})"
+
+
+class OrderItem:
+    """订单中的一个产品；qty 和 qty_oh（库存）为数值，stock_status 未生成订货列时为空字符串"""
+    __slots__ = ("vendor_plu", "vendor_name", "qty", "qty_oh", "stock_status")
+
+    def __init__(self, vendor_plu, vendor_name, qty, qty_oh=0, stock_status=""):
+        self.vendor_plu = vendor_plu
+        self.vendor_name = vendor_name
+        self.qty = qty
+        self.qty_oh = qty_oh
+        self.stock_status = stock_status
+
+    def __repr__(self):
+        return (f"OrderItem({self.vendor_plu!r}, {self.vendor_name!r}, {self.qty!r}, "
+                f"{self.qty_oh!r}, {self.stock_status!r})")
+
+
+class OrderSeparator:
+    """订单之间的分隔空行"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "SEPARATOR"
+
+
+# 所有订单共用同一个分隔行实例
+SEPARATOR = OrderSeparator()
+
+# 订单占用后库存至少还要剩下的数量，少于此数即需要订货；订货列与缺货汇总共用同一标准
+MIN_STOCK_LEFT = 1
+
+
+def parse_quantity(value):
+    """将详情页中的数量（字符串或数字）转换为数值，整数值返回 int"""
+    quantity = float(value or 0)
+    return int(quantity) if quantity.is_integer() else quantity
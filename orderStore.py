@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS orders ("
+    "original_id TEXT PRIMARY KEY, number TEXT, user_name TEXT, first_name TEXT, last_name TEXT, "
+    "created TEXT, created_date TEXT, finished INTEGER, synced_at REAL NOT NULL, "
+    "phone_cell TEXT, phone_home TEXT, phone_office TEXT, detail_finished INTEGER, detail_synced_at REAL)",
+    "CREATE TABLE IF NOT EXISTS items ("
+    "original_id TEXT NOT NULL, position INTEGER NOT NULL, vendor_plu TEXT, vendor_name TEXT, "
+    "qty REAL, qty_oh REAL, PRIMARY KEY (original_id, position))",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_created_date ON orders (created_date, finished)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_number ON orders (number)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_name ON orders (user_name, created_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_finished ON orders (finished)",
+    "CREATE INDEX IF NOT EXISTS idx_items_vendor_plu ON items (vendor_plu)",
+]
+
+ORDER_COLUMNS = "original_id, number, user_name, first_name, last_name, created, finished"
+
+
+class OrderStore:
+    """
+    本地 SQLite 订单库：列表页中的订单和详情页中的产品行。
+
+    订单按 Created 日期、Number、UserName、finished 建立索引，产品行按 VendorPLU 建立索引，
+    按日期、单号、销售查询都在本地完成，只需通过 DataProcessor.sync_order_store 增量同步最近的列表页；
+    只有最近一次同步覆盖范围内的订单可以直接使用（synced_from），更早的订单 finished 可能已过期。
+    get / put 与 DetailCache 接口相同，可作为 iter_order_details 的详情缓存：
+    finished 与保存详情时不同、或详情超过 detail_ttl_seconds 时视为需要重新获取。
+    """
+
+    def __init__(self, path, detail_ttl_seconds=24 * 3600):
+        self.detail_ttl_seconds = detail_ttl_seconds
+        self.lock = threading.Lock()
+        # 同步和生成在后台线程中运行，允许跨线程使用同一连接，由 lock 串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def upsert_orders(self, datalist):
+        """写入或更新列表页中的订单，已保存的详情保持不变；返回写入的订单数"""
+        now = time.time()
+        rows = [
+            (
+                str(item["OriginalID"]), item.get("Number"), item.get("UserName"), item.get("FirstName"),
+                item.get("LastName"), item.get("Created"), (item.get("Created") or "")[:10] or None,
+                item.get("finished"), now
+            )
+            for item in datalist if "OriginalID" in item
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO orders (original_id, number, user_name, first_name, last_name, created, created_date, "
+                "finished, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (original_id) DO UPDATE SET number = excluded.number, user_name = excluded.user_name, "
+                "first_name = excluded.first_name, last_name = excluded.last_name, created = excluded.created, "
+                "created_date = excluded.created_date, finished = excluded.finished, synced_at = excluded.synced_at",
+                rows
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def newest_created_date(self):
+        """库中最新订单的日期，库为空时返回 None"""
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(created_date) FROM orders").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def sync_start_date(self, resync_days):
+        """增量同步需要回看到的最早日期；库为空时返回 None，表示完整同步"""
+        newest = self.newest_created_date()
+        if newest is None:
+            return None
+        return newest - timedelta(days=resync_days)
+
+    def synced_from(self):
+        """最近一次同步覆盖的最早日期，此后的订单及其 finished 与列表页一致；从未同步时返回 None"""
+        value = self.get_meta("synced_from")
+        return date.fromisoformat(value) if value else None
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            self.conn.commit()
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def find_orders(self, where, params):
+        """按条件查询订单，按 Created 倒序返回与 datalist 项相同结构的字典"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {ORDER_COLUMNS} FROM orders WHERE {where} ORDER BY created DESC", params
+            ).fetchall()
+        return [
+            {
+                "OriginalID": int(original_id) if original_id.isdigit() else original_id,
+                "Number": number, "UserName": user_name, "FirstName": first_name, "LastName": last_name,
+                "Created": created, "finished": finished,
+            }
+            for original_id, number, user_name, first_name, last_name, created, finished in rows
+        ]
+
+    def finished_clause(self, finished_filter, where, params):
+        if finished_filter in [0, 1]:
+            return f"{where} AND finished = ?", params + [finished_filter]
+        return where, params
+
+    def find_by_date(self, target_date, finished_filter=-1):
+        where, params = self.finished_clause(finished_filter, "created_date = ?", [target_date.isoformat()])
+        return self.find_orders(where, params)
+
+    def find_by_number(self, number, finished_filter=-1):
+        where, params = self.finished_clause(finished_filter, "number = ?", [number])
+        return self.find_orders(where, params)
+
+    def find_by_salesperson(self, user_name, start_date, end_date, finished_filter=-1):
+        """查询某个销售在 [start_date, end_date] 之间的订单"""
+        where, params = self.finished_clause(
+            finished_filter, "user_name = ? AND created_date BETWEEN ? AND ?",
+            [user_name, start_date.isoformat(), end_date.isoformat()]
+        )
+        return self.find_orders(where, params)
+
+    def salespeople(self):
+        """库中出现过的所有销售"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT user_name FROM orders WHERE user_name IS NOT NULL ORDER BY user_name"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, original_id, finished=None):
+        """返回保存的订单详情（与 var data 结构相同），没有详情、详情过期或 finished 已变化时返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT phone_cell, phone_home, phone_office, detail_finished, detail_synced_at "
+                "FROM orders WHERE original_id = ?", (str(original_id),)
+            ).fetchone()
+            if row is None or row[4] is None:
+                return None
+            items = self.conn.execute(
+                "SELECT vendor_plu, vendor_name, qty, qty_oh FROM items WHERE original_id = ? ORDER BY position",
+                (str(original_id),)
+            ).fetchall()
+        phone_cell, phone_home, phone_office, detail_finished, detail_synced_at = row
+        if self.detail_ttl_seconds and time.time() - detail_synced_at > self.detail_ttl_seconds:
+            return None
+        if finished is not None and detail_finished != finished:
+            return None
+        return {
+            "OriginalID": original_id,
+            "PhoneCell": phone_cell or "", "PhoneHome": phone_home or "", "PhoneOffice": phone_office or "",
+            "items": [
+                {"VendorPLU": vendor_plu, "VendorName": vendor_name, "Qty": qty, "Qty_OH": qty_oh}
+                for vendor_plu, vendor_name, qty, qty_oh in items
+            ],
+        }
+
+    def put(self, original_id, data_content, finished=None):
+        """保存订单详情（电话和产品行）；订单尚未出现在列表页同步中时先建立占位记录"""
+        original_id = str(original_id)
+        items = [
+            (original_id, position, item.get("VendorPLU"), item.get("VendorName"),
+             to_number(item.get("Qty")), to_number(item.get("Qty_OH")))
+            for position, item in enumerate(data_content.get("items", []))
+        ]
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO orders (original_id, finished, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (original_id) DO NOTHING", (original_id, finished, now)
+            )
+            self.conn.execute(
+                "UPDATE orders SET phone_cell = ?, phone_home = ?, phone_office = ?, detail_finished = ?, "
+                "detail_synced_at = ? WHERE original_id = ?",
+                (data_content.get("PhoneCell"), data_content.get("PhoneHome"), data_content.get("PhoneOffice"),
+                 finished, now, original_id)
+            )
+            self.conn.execute("DELETE FROM items WHERE original_id = ?", (original_id,))
+            self.conn.executemany(
+                "INSERT INTO items (original_id, position, vendor_plu, vendor_name, qty, qty_oh) "
+                "VALUES (?, ?, ?, ?, ?, ?)", items
+            )
+            self.conn.commit()
+
+    def invalidate(self, original_id):
+        """丢弃指定订单已保存的详情，下次生成时重新获取"""
+        with self.lock:
+            self.conn.execute("UPDATE orders SET detail_synced_at = NULL WHERE original_id = ?", (str(original_id),))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def to_number(value):
+    """详情页中的数量可能是字符串，无法转换时返回 None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
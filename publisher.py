@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+QUEUE_FILENAME = "publish_queue.json"
+
+
+class Publisher:
+    """
+    先在本地暂存目录生成工作簿，再发布到共享目录。
+
+    发布时先复制为共享目录中的临时文件，再一次 os.replace 改名为目标文件，
+    同事打开时只会看到完整的旧文件或新文件。共享目录不可用时把文件加入重试队列，
+    生成流程不会因此失败。
+    """
+
+    def __init__(self, output_dir, staging_dir=None):
+        self.output_dir = output_dir
+        self.staging_dir = staging_dir or os.path.join(tempfile.gettempdir(), "viva_export")
+        self.queue_path = os.path.join(self.staging_dir, QUEUE_FILENAME)
+        self.lock = threading.Lock()
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    def staging_path(self, filename):
+        """返回本地暂存文件路径，文件名加随机前缀避免与队列中的旧文件冲突"""
+        return os.path.join(self.staging_dir, f"{uuid.uuid4().hex[:8]}_{filename}")
+
+    def destination_path(self, filename):
+        return f"{self.output_dir}/{filename}"
+
+    def publish(self, local_path, filename):
+        """
+        发布本地文件到共享目录。
+
+        :return: (是否已发布, 目标路径)；失败时文件已加入重试队列
+        """
+        dest_path = self.destination_path(filename)
+        try:
+            self.copy_then_rename(local_path, dest_path)
+        except OSError as e:
+            print(f"发布到共享目录失败，已加入重试队列: {e}")
+            self.enqueue(local_path, dest_path)
+            return False, dest_path
+        self.remove_local(local_path)
+        self.discard(dest_path)
+        return True, dest_path
+
+    def copy_then_rename(self, local_path, dest_path):
+        """复制到同目录下的临时文件后原子改名"""
+        dest_dir, dest_name = os.path.split(dest_path)
+        temp_path = os.path.join(dest_dir, f".{dest_name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            shutil.copyfile(local_path, temp_path)
+            os.replace(temp_path, dest_path)
+        except OSError:
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def load_queue(self):
+        if not os.path.exists(self.queue_path):
+            return []
+        try:
+            with open(self.queue_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"无法读取重试队列: {e}")
+            return []
+
+    def save_queue(self, queue):
+        temp_path = f"{self.queue_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(queue, f, ensure_ascii=False)
+        os.replace(temp_path, self.queue_path)
+
+    def enqueue(self, local_path, dest_path):
+        """加入重试队列；同一目标文件只保留最新的一份"""
+        with self.lock:
+            queue = self.load_queue()
+            for entry in queue:
+                if entry["dest_path"] == dest_path:
+                    self.remove_local(entry["local_path"])
+            queue = [entry for entry in queue if entry["dest_path"] != dest_path]
+            queue.append({"local_path": local_path, "dest_path": dest_path})
+            self.save_queue(queue)
+
+    def discard(self, dest_path):
+        """目标文件已发布新版本时，丢弃队列中同一目标的旧文件"""
+        with self.lock:
+            queue = self.load_queue()
+            stale = [entry for entry in queue if entry["dest_path"] == dest_path]
+            if not stale:
+                return
+            for entry in stale:
+                self.remove_local(entry["local_path"])
+            self.save_queue([entry for entry in queue if entry["dest_path"] != dest_path])
+
+    def pending(self):
+        """返回仍在重试队列中的目标路径"""
+        with self.lock:
+            return [entry["dest_path"] for entry in self.load_queue()]
+
+    def retry_pending(self):
+        """
+        按入队顺序重试队列中的文件，返回本次发布成功的目标路径。
+
+        共享目录不可用时每个文件都要等一次超时，因此第一次失败后就停止，其余文件留在队列中。
+        """
+        with self.lock:
+            queue = self.load_queue()
+            if not queue:
+                return []
+            published = []
+            remaining = []
+            for index, entry in enumerate(queue):
+                if not os.path.exists(entry["local_path"]):
+                    continue
+                try:
+                    self.copy_then_rename(entry["local_path"], entry["dest_path"])
+                except OSError:
+                    remaining = queue[index:]
+                    break
+                self.remove_local(entry["local_path"])
+                published.append(entry["dest_path"])
+            self.save_queue(remaining)
+            return published
+
+    def remove_local(self, local_path):
+        try:
+            os.remove(local_path)
+        except OSError:
+            pass
@@ -0,0 +1,157 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# 请求延迟直方图的分桶上限（毫秒）
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+# 报告目录中最多保留的运行次数，超出时删除最早的报告
+KEEP_REPORTS = 200
+
+
+class RunProfiler:
+    """
+    记录一次生成的各阶段耗时、每个请求的延迟和传输字节数，可选 cProfile 采样。
+
+    stage() 可在多个线程中同时使用，同名阶段的耗时累加；
+    cProfile 只采集调用 start_cprofile() 的线程（即生成流程所在线程）。
+    """
+
+    def __init__(self, enable_cprofile=False):
+        self.enable_cprofile = enable_cprofile
+        self.lock = threading.Lock()
+        self.stages = {}  # 阶段名 → [次数, 累计秒数]
+        self.stage_order = []
+        self.requests = {}  # 请求类别 → {"count", "bytes", "total", "buckets"}
+        self.profile = None
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    @contextmanager
+    def stage(self, name):
+        """计时一个阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                if name not in self.stages:
+                    self.stages[name] = [0, 0.0]
+                    self.stage_order.append(name)
+                self.stages[name][0] += 1
+                self.stages[name][1] += elapsed
+
+    def record_request(self, url, seconds, size, not_modified=False):
+        """记录一个 HTTP 请求的延迟和传输大小（压缩后），按 URL 路径归类"""
+        kind = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1] or "/"
+        with self.lock:
+            stats = self.requests.setdefault(
+                kind, {"count": 0, "not_modified": 0, "bytes": 0, "total": 0.0,
+                       "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            )
+            stats["count"] += 1
+            if not_modified:
+                stats["not_modified"] += 1
+            stats["bytes"] += size
+            stats["total"] += seconds
+            latency_ms = seconds * 1000
+            for index, limit in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= limit:
+                    stats["buckets"][index] += 1
+                    break
+            else:
+                stats["buckets"][-1] += 1
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests 的 response 钩子"""
+        # Content-Length 是压缩后的传输大小；没有时按解压后的内容计
+        size = int(response.headers.get("Content-Length") or len(response.content))
+        self.record_request(response.url, response.elapsed.total_seconds(), size, response.status_code == 304)
+
+    def attach(self, session):
+        """开始记录该会话的请求"""
+        session.hooks["response"].append(self.response_hook)
+
+    def detach(self, session):
+        if self.response_hook in session.hooks["response"]:
+            session.hooks["response"].remove(self.response_hook)
+
+    def start_cprofile(self):
+        if self.enable_cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        """结束计时和 cProfile 采样"""
+        if self.profile is not None:
+            self.profile.disable()
+        self.finished_at = time.perf_counter()
+
+    def report(self):
+        """生成可读的运行报告"""
+        total = (self.finished_at or time.perf_counter()) - self.started_at
+        lines = [f"运行报告 {datetime.now():%Y-%m-%d %H:%M:%S}", f"总耗时: {total:.2f} s", "", "阶段耗时（多线程阶段为累计值）:"]
+        with self.lock:
+            for name in self.stage_order:
+                count, seconds = self.stages[name]
+                lines.append(f"  {name:<16} {seconds:8.3f} s  ({count} 次)")
+
+            lines.append("")
+            lines.append("HTTP 请求:")
+            bucket_labels = [f"<={limit}ms" for limit in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            for kind, stats in self.requests.items():
+                average = stats["total"] / stats["count"] * 1000
+                lines.append(
+                    f"  {kind}: {stats['count']} 次（304 未修改 {stats['not_modified']} 次）, "
+                    f"{stats['bytes'] / 1024:.1f} KB, 平均 {average:.0f} ms"
+                )
+                histogram = ", ".join(
+                    f"{label}: {count}" for label, count in zip(bucket_labels, stats["buckets"]) if count
+                )
+                lines.append(f"    延迟分布: {histogram}")
+
+        if self.profile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(25)
+            lines.append("")
+            lines.append("cProfile（按累计耗时前 25 项）:")
+            lines.append(stream.getvalue())
+        return "\n".join(lines)
+
+    def save(self, report_dir, keep=KEEP_REPORTS):
+        """将报告（以及 cProfile 原始数据）写入 report_dir，返回报告文件路径；只保留最近 keep 次运行的报告"""
+        os.makedirs(report_dir, exist_ok=True)
+        # 同一秒内多次运行（登录和生成、GUI 和 batchCli 同时运行）时靠进程号和随机后缀区分
+        name = f"run_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        report_path = os.path.join(report_dir, f"{name}.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(report_dir, f"{name}.prof"))
+        prune_reports(report_dir, keep)
+        return report_path
+
+
+def prune_reports(report_dir, keep):
+    """按文件名中的时间删除最早的运行报告，只保留最近 keep 次运行"""
+    try:
+        filenames = os.listdir(report_dir)
+    except OSError:
+        return
+    runs = sorted({os.path.splitext(filename)[0] for filename in filenames
+                   if filename.startswith("run_") and filename.endswith((".txt", ".prof"))})
+    for name in runs[:max(len(runs) - keep, 0)]:
+        for extension in (".txt", ".prof"):
+            try:
+                os.remove(os.path.join(report_dir, name + extension))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"无法删除旧的运行报告: {e}")
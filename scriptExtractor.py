@@ -0,0 +1,65 @@
+import json
+import re
+
+# 预编译的变量定位正则，只匹配 "var 名称 =" 本身，不再用 .*? 跨越整个页面
+DATALIST_PATTERN = re.compile(r"var\s+datalist\s*=\s*")
+DATA_PATTERN = re.compile(r"var\s+data\s*=\s*")
+
+# 生成流程实际用到的字段；parse_* 只保留这些字段，进程池解析时回传的数据尽量小
+DATALIST_FIELDS = ("OriginalID", "Number", "UserName", "FirstName", "LastName", "Created", "finished")
+DATA_FIELDS = ("OriginalID", "PhoneCell", "PhoneHome", "PhoneOffice")
+ITEM_FIELDS = ("VendorPLU", "VendorName", "Qty", "Qty_OH")
+
+# raw_decode 从指定位置开始解码，由 C 实现的扫描器按括号深度找到值的结束位置，
+# 字符串中的括号、分号和转义引号都会被正确处理，且无需先切片复制页面
+DECODER = json.JSONDecoder()
+
+
+def extract_script_var(html_content, pattern, opener):
+    """
+    定位一次脚本变量，并从其起始括号处直接解码到对应的闭合括号为止。
+
+    :param pattern: 预编译的 "var 名称 =" 正则
+    :param opener: 期望的起始括号，'[' 或 '{'
+    :return: 解码后的对象，找不到变量时返回 None
+    """
+    match = pattern.search(html_content)
+    if not match:
+        return None
+    start = match.end()
+    if html_content[start:start + 1] != opener:
+        return None
+    value, _ = DECODER.raw_decode(html_content, start)
+    return value
+
+
+def extract_datalist(html_content):
+    """从列表页 HTML 中提取 var datalist 数组"""
+    return extract_script_var(html_content, DATALIST_PATTERN, "[")
+
+
+def extract_data(html_content):
+    """从详情页 HTML 中提取 var data 对象"""
+    return extract_script_var(html_content, DATA_PATTERN, "{")
+
+
+def pick_fields(item, fields):
+    return {field: item[field] for field in fields if field in item}
+
+
+def parse_index_page(html_content):
+    """解析列表页，只保留 DATALIST_FIELDS；找不到 datalist 时返回空列表"""
+    datalist = extract_datalist(html_content)
+    if not isinstance(datalist, list):
+        return []
+    return [pick_fields(item, DATALIST_FIELDS) for item in datalist]
+
+
+def parse_document_page(html_content):
+    """解析详情页，只保留 DATA_FIELDS 和 items 的 ITEM_FIELDS；找不到 data 时返回 None"""
+    data = extract_data(html_content)
+    if data is None:
+        return None
+    compact = pick_fields(data, DATA_FIELDS)
+    compact["items"] = [pick_fields(item, ITEM_FIELDS) for item in data.get("items", [])]
+    return compact
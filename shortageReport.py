@@ -0,0 +1,86 @@
+from orderRecords import MIN_STOCK_LEFT, OrderHeader, OrderItem, parse_quantity
+
+SHORTAGE_SHEET = "缺货汇总"
+SHORTAGE_HEADERS = ["产品型号", "供货商", "订单数", "需求数量", "库存", "缺货数量"]
+
+
+class ShortageReport:
+    """
+    汇总一次生成中所有产品行的需求，按 VendorPLU 与库存比较，得出净缺货。
+
+    订货列只看单行的 Qty_OH - Qty，多个订单同时占用同一产品的最后库存时都会显示现货；
+    这里先合计同一产品在所有订单中的需求，再与库存比较。
+    判断标准与订货列相同：满足所有需求后库存少于 MIN_STOCK_LEFT 即列入，
+    缺货数量为补足需求并保留 MIN_STOCK_LEFT 所需的数量。
+    产品行以列的形式收集，最后用 pandas 一次分组计算；未安装 pandas 时逐行累加。
+    """
+
+    def __init__(self):
+        self.numbers = []
+        self.plus = []
+        self.vendors = []
+        self.qtys = []
+        self.stocks = []
+
+    def __len__(self):
+        return len(self.plus)
+
+    def track(self, data_rows):
+        """原样产出 data_rows，同时记录其中的产品行"""
+        number = None
+        for record in data_rows:
+            if isinstance(record, OrderHeader):
+                number = record.number
+            elif isinstance(record, OrderItem) and record.vendor_plu:
+                self.numbers.append(number)
+                self.plus.append(record.vendor_plu)
+                self.vendors.append(record.vendor_name or "")
+                self.qtys.append(record.qty)
+                self.stocks.append(record.qty_oh)
+            yield record
+
+    def shortages(self):
+        """返回缺货的产品行 [产品型号, 供货商, 订单数, 需求数量, 库存, 缺货数量]，按供货商和产品型号排序"""
+        try:
+            import pandas as pd
+        except ImportError:
+            return self.shortages_without_pandas()
+
+        table = pd.DataFrame({
+            "number": self.numbers, "plu": self.plus, "vendor": self.vendors,
+            "qty": self.qtys, "stock": self.stocks,
+        })
+        table = table[table["qty"] > 0]
+        # 同一产品的库存在各详情页中相同，取最大值以防个别页面获取时间不同
+        grouped = table.groupby("plu", sort=False).agg(
+            vendor=("vendor", "first"), orders=("number", "nunique"), demand=("qty", "sum"), stock=("stock", "max")
+        )
+        grouped["shortage"] = grouped["demand"] + MIN_STOCK_LEFT - grouped["stock"].clip(lower=0)
+        grouped = grouped[grouped["shortage"] > 0].reset_index().sort_values(["vendor", "plu"])
+        return [
+            [row.plu, row.vendor, int(row.orders), parse_quantity(row.demand),
+             parse_quantity(row.stock), parse_quantity(row.shortage)]
+            for row in grouped.itertuples(index=False)
+        ]
+
+    def shortages_without_pandas(self):
+        totals = {}  # VendorPLU → [供货商, 单号集合, 需求数量, 库存]
+        for number, plu, vendor, qty, stock in zip(self.numbers, self.plus, self.vendors, self.qtys, self.stocks):
+            if qty <= 0:
+                continue
+            if plu not in totals:
+                totals[plu] = [vendor, set(), 0, stock]
+            entry = totals[plu]
+            if number is not None:  # 与 pandas 的 nunique 一致，不计缺少单号的行
+                entry[1].add(number)
+            entry[2] += qty
+            entry[3] = max(entry[3], stock)
+
+        rows = []
+        for plu, (vendor, numbers, demand, stock) in totals.items():
+            shortage = demand + MIN_STOCK_LEFT - max(stock, 0)
+            if shortage > 0:
+                rows.append([plu, vendor, len(numbers), parse_quantity(demand), parse_quantity(stock),
+                             parse_quantity(shortage)])
+        rows.sort(key=lambda row: (row[1], row[0]))
+        return rows
@@ -0,0 +1,356 @@
+import itertools
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from dataProcessor import OperationCancelled, target_label
+from runProfiler import RunProfiler
+from shortageReport import ShortageReport
+
+
+class LoginWorker(QThread):
+    """
+    在后台线程中登录并获取默认单号。
+
+    优先复用 cookie_path 中保存的 cookie，并用一次 url1 请求验证；
+    验证失败且 allow_browser 为 True 时才启动浏览器登录，成功后重新保存 cookie。
+    """
+    browser_ready = pyqtSignal()  # 浏览器已打开，等待用户完成登录
+    succeeded = pyqtSignal(object, str)  # (session, 默认单号)
+    saved_session_invalid = pyqtSignal()  # 已保存的 cookie 无效且不允许启动浏览器
+    failed = pyqtSignal(str)
+    report_ready = pyqtSignal(str)  # 运行报告文件路径
+
+    def __init__(self, processor, login_url, url1, cookie_path=None, allow_browser=True, report_dir=None, parent=None):
+        super().__init__(parent)
+        self.processor = processor
+        self.login_url = login_url
+        self.url1 = url1
+        self.cookie_path = cookie_path
+        self.allow_browser = allow_browser
+        self.report_dir = report_dir
+        self.login_confirmed = threading.Event()
+        self.cancel_event = threading.Event()
+
+    def confirm_login(self):
+        """GUI 线程在用户确认已完成浏览器登录后调用"""
+        self.login_confirmed.set()
+
+    def cancel(self):
+        """关闭窗口时调用：结束等待，浏览器关闭后线程退出"""
+        self.cancel_event.set()
+        self.login_confirmed.set()
+
+    def wait_for_login(self):
+        """通知 GUI 弹出提示，并阻塞直到用户确认；已取消时抛出 OperationCancelled"""
+        self.browser_ready.emit()
+        self.login_confirmed.wait()
+        if self.cancel_event.is_set():
+            raise OperationCancelled("登录已取消")
+
+    def try_saved_session(self):
+        """尝试复用已保存的 cookie，有效时返回 (session, 默认单号)，否则返回 None"""
+        if not self.cookie_path:
+            return None
+        session = self.processor.load_saved_session(self.cookie_path)
+        if session is None:
+            return None
+        default_order_number = self.processor.fetch_default_order_number(session, self.url1)
+        if default_order_number in ("解析错误", "URL错误") or not default_order_number:
+            return None
+        return session, default_order_number
+
+    def run(self):
+        profiler = RunProfiler()
+        self.processor.profiler = profiler
+        try:
+            self.login(profiler)
+        finally:
+            profiler.stop()
+            self.processor.profiler = None
+            if self.report_dir:
+                try:
+                    self.report_ready.emit(profiler.save(self.report_dir))
+                except OSError as e:
+                    print(f"无法保存运行报告: {e}")
+
+    def login(self, profiler):
+        try:
+            with profiler.stage("验证已保存的登录"):
+                saved = self.try_saved_session()
+            if saved is not None:
+                self.succeeded.emit(*saved)
+                return
+            if not self.allow_browser:
+                self.saved_session_invalid.emit()
+                return
+
+            session = self.processor.get_authenticated_session(self.login_url, wait_for_login=self.wait_for_login)
+
+            # 登录成功后尝试加载默认单号
+            with profiler.stage("获取默认单号"):
+                default_order_number = self.processor.fetch_default_order_number(session, self.url1)
+            if default_order_number == "解析错误" or not default_order_number:
+                raise ValueError("默认单号解析失败，登录未完成。")
+
+            if self.cookie_path:
+                try:
+                    self.processor.save_session_cookies(session, self.cookie_path)
+                except OSError as e:
+                    print(f"无法保存 cookie: {e}")
+
+            self.succeeded.emit(session, default_order_number)
+        except OperationCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class GenerateWorker(QThread):
+    """在后台线程中执行 列表页 → 筛选 → 详情页 → Excel 的完整生成流程"""
+    progress = pyqtSignal(str, int, int)  # (阶段, 已完成, 总数)，总数为 0 表示未知
+    succeeded = pyqtSignal(str)  # 输出文件路径
+    queued = pyqtSignal(str, str)  # 共享目录不可用：(目标路径, 本地暂存路径)
+    empty = pyqtSignal()  # 没有可写入的内容
+    no_new_orders = pyqtSignal()  # 增量模式下没有新增或变化的订单
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+    failures_found = pyqtSignal(list)  # 重试后仍失败的订单汇总
+    report_ready = pyqtSignal(str)  # 运行报告文件路径
+
+    def __init__(self, processor, writer, publisher, session, params, parent=None):
+        super().__init__(parent)
+        self.processor = processor
+        self.writer = writer
+        self.publisher = publisher
+        self.session = session
+        self.params = params
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """请求取消，工作线程会在下一个检查点停止"""
+        self.cancel_event.set()
+
+    def report_progress(self, stage, done, total):
+        self.progress.emit(stage, done, total)
+
+    def run(self):
+        failures = []
+        profiler = RunProfiler(enable_cprofile=self.params.get("profile", False))
+        self.processor.profiler = profiler
+        profiler.attach(self.session)
+        profiler.start_cprofile()
+        try:
+            self.generate(failures, profiler)
+        except OperationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            profiler.stop()
+            profiler.detach(self.session)
+            self.processor.profiler = None
+            if failures:
+                self.failures_found.emit(failures)
+            self.save_report(profiler)
+
+    def save_report(self, profiler):
+        """保存运行报告，失败时只打印"""
+        report_dir = self.params.get("report_dir")
+        if not report_dir:
+            return
+        try:
+            self.report_ready.emit(profiler.save(report_dir))
+        except OSError as e:
+            print(f"无法保存运行报告: {e}")
+
+    def filter_targets(self, profiler):
+        """
+        返回 {目标: 筛选结果}。列表页只读取一次；启用本地订单库时增量同步列表页
+        （按日期或销售时至少同步到最早的目标日期），同步范围内的目标在本地查询，
+        库无法确定结果的目标（早于同步范围、单号不在库中）仍从列表页筛选。
+        """
+        params = self.params
+        targets = params["targets"]
+        mode = params["mode"]
+        order_store = params.get("order_store")
+        # 登录时保存的第一页快照只供登录后的第一次生成使用；增量模式和订单库同步总是实时读取
+        use_snapshot = not params["incremental"] and order_store is None
+        if not use_snapshot:
+            self.processor.clear_datalist_snapshot()
+        if order_store is not None:
+            if mode == "date":
+                min_date = min(targets)
+            elif mode == "salesperson":
+                min_date = min(start_date for _, start_date, _ in targets)
+            else:
+                min_date = None
+            # 界面上的生成只同步到目标日期，回看 order_store_resync_days 天的复查留给 autoSync
+            with profiler.stage("同步订单库"):
+                self.processor.sync_order_store(
+                    self.session, params["url1"], order_store,
+                    resync_days=0,
+                    min_date=min_date,
+                    prefetch_pages=params["prefetch_pages"],
+                    max_pages=params["max_pages"],
+                    progress=self.report_progress,
+                    cancel_event=self.cancel_event
+                )
+            with profiler.stage("订单库查询"):
+                filtered_by_target = {
+                    target: self.processor.query_order_store(order_store, target, mode, params["finished_filter"])
+                    for target in targets
+                }
+            missing = [target for target, filtered_data in filtered_by_target.items() if filtered_data is None]
+            if mode == "salesperson":
+                if missing:
+                    raise ValueError(f"列表页最多翻 {params['max_pages']} 页，未能同步到 {min_date}，"
+                                     f"请缩小日期范围或增大 max_pages")
+                return filtered_by_target
+            if not missing:
+                return filtered_by_target
+        else:
+            filtered_by_target = {}
+            missing = targets
+
+        with profiler.stage("列表页与筛选"):
+            datalist = self.processor.iter_datalist(
+                self.session, params["url1"],
+                min_date=min(missing) if mode == "date" else None,
+                prefetch_pages=params["prefetch_pages"],
+                max_pages=params["max_pages"],
+                progress=self.report_progress,
+                cancel_event=self.cancel_event,
+                use_snapshot=use_snapshot
+            )
+            filtered_by_target.update(
+                self.processor.filter_targets(datalist, missing, mode, params["finished_filter"])
+            )
+            datalist.close()  # 筛选结束后停止翻页和预取
+        return {target: filtered_by_target[target] for target in targets}
+
+    def invalidate_cached_details(self, filtered_data):
+        """选择重新获取订单详情时，先丢弃这些订单的详情缓存，获取后重新写入"""
+        cache = self.params.get("detail_cache")
+        if cache is None or not self.params.get("refresh_details"):
+            return
+        for data in filtered_data:
+            cache.invalidate(data["OriginalID"])
+
+    def generate_sheets(self, failures, profiler):
+        """多个目标或按销售划分：每个订单只获取一次详情，所有工作表写入同一个工作簿，只保存和发布一次"""
+        params = self.params
+        filtered_by_target = self.filter_targets(profiler)
+        if params["sheet_grouping"] == "salesperson":
+            filtered_by_sheet = self.processor.group_by_salesperson(filtered_by_target)
+        else:
+            filtered_by_sheet = {target_label(target): data for target, data in filtered_by_target.items()}
+        # 没有订单的目标不生成空工作表
+        filtered_by_sheet = {sheet: data for sheet, data in filtered_by_sheet.items() if data}
+        if not filtered_by_sheet:
+            self.empty.emit()
+            return
+
+        for filtered_data in filtered_by_sheet.values():
+            self.invalidate_cached_details(filtered_data)
+        rows_by_sheet = self.processor.fetch_and_format_targets(
+            filtered_by_sheet, self.session, params["base_url"],
+            params["include_stock_status"], params["skip_negative_qty"],
+            max_workers=params["fetch_workers"],
+            progress=self.report_progress,
+            cancel_event=self.cancel_event,
+            cache=params.get("detail_cache"),
+            failures=failures
+        )
+        local_path = self.publisher.staging_path(params["output_filename"])
+        with profiler.stage("获取订单详情并写入 Excel"):
+            self.writer.write_sheets(
+                rows_by_sheet, local_path, progress=self.report_progress, cancel_event=self.cancel_event,
+                shortage_report=ShortageReport() if params["include_stock_status"] else None
+            )
+
+        with profiler.stage("发布到共享目录"):
+            published, dest_path = self.publisher.publish(local_path, params["output_filename"])
+            # 本次文件发布成功说明共享目录可用，再补发队列中的旧文件
+            if published:
+                self.publisher.retry_pending()
+        if published:
+            self.succeeded.emit(dest_path)
+        else:
+            self.queued.emit(dest_path, local_path)
+
+    def generate(self, failures, profiler):
+        """列表页 → 筛选 → 详情页 → Excel → 发布"""
+        params = self.params
+        if len(params["targets"]) > 1 or params["sheet_grouping"] != "target":
+            self.generate_sheets(failures, profiler)
+            return
+
+        filtered_data = self.filter_targets(profiler)[params["target"]]
+
+        # 增量模式：只追加相对上次导出新增的订单；已导出的订单有变化时完整生成
+        export_state = params["export_state"]
+        state_key = params["output_filename"]
+        signature = {
+            "mode": params["mode"],
+            "target": str(params["target"]),
+            "finished_filter": params["finished_filter"],
+            "include_stock_status": params["include_stock_status"],
+            "skip_negative_qty": params["skip_negative_qty"],
+        }
+        orders_to_fetch = filtered_data
+        append = False
+        # 重新获取详情时已导出的订单也可能有修改，完整生成
+        if params["incremental"] and not params.get("refresh_details"):
+            changed = export_state.changed_orders(state_key, signature, filtered_data)
+            if changed is not None:
+                if not changed:
+                    self.no_new_orders.emit()
+                    return
+                # 缺货汇总要按全部订单重新计算，追加时无法更新，有新订单就完整生成
+                if not params["include_stock_status"]:
+                    orders_to_fetch = changed
+                    append = True
+
+        # 详情页 → Excel 行 → 工作表逐个订单流式进行，每个订单的行取到后立即写入
+        self.invalidate_cached_details(orders_to_fetch)
+        data_rows = self.processor.iter_order_rows(
+            orders_to_fetch, self.session, params["base_url"],
+            params["include_stock_status"], params["skip_negative_qty"],
+            max_workers=params["fetch_workers"],
+            progress=self.report_progress,
+            cancel_event=self.cancel_event,
+            cache=params.get("detail_cache"),
+            failures=failures
+        )
+        with profiler.stage("获取订单详情并写入 Excel"):
+            # 检查是否有内容可写入 Excel
+            first_row = next(data_rows, None)
+            if first_row is None:
+                self.empty.emit()
+                return
+            data_rows = itertools.chain([first_row], data_rows)
+
+            # 先在本地生成完整文件，再一次性发布到共享目录
+            local_path = self.publisher.staging_path(params["output_filename"])
+            if append:
+                self.writer.append(data_rows, export_state.workbook_copy_path(state_key), local_path,
+                                   progress=self.report_progress, cancel_event=self.cancel_event)
+            else:
+                # 生成订货列时，附带按产品合计需求的缺货汇总工作表
+                shortage_report = ShortageReport() if params["include_stock_status"] else None
+                self.writer.write(data_rows, local_path, progress=self.report_progress, cancel_event=self.cancel_event,
+                                  shortage_report=shortage_report)
+
+        # 获取失败的订单不记入导出记录，下次增量生成时会重试
+        failed_ids = {failure["OriginalID"] for failure in failures}
+        exported = [data for data in orders_to_fetch if data["OriginalID"] not in failed_ids]
+        export_state.record(state_key, signature, exported, local_path, append=append)
+
+        with profiler.stage("发布到共享目录"):
+            published, dest_path = self.publisher.publish(local_path, params["output_filename"])
+            # 本次文件发布成功说明共享目录可用，再补发队列中的旧文件
+            if published:
+                self.publisher.retry_pending()
+        if published:
+            self.succeeded.emit(dest_path)
+        else:
+            self.queued.emit(dest_path, local_path)